@@ -3,8 +3,20 @@ import requests
 import json
 import datetime as dt
 
-__all__ = ['aqs_login','readin','utils']
+__all__ = ['aqs_login','readin','utils','local_store','merge','summaries','sync','schemas','panel','chunked','client','backends','completeness','regrid']
 
 from . import readin
 from . import utils 
 from . import aqs_login
+from . import local_store
+from . import merge
+from . import summaries
+from . import sync
+from . import schemas
+from . import panel
+from . import chunked
+from . import client
+from .client import AQSClient
+from . import backends
+from . import completeness
+from . import regrid
@@ -27,8 +27,6 @@ def account_setup():
     response = check_response(question, affirmative, negative)
     if response != None:
         if response.lower() in affirmative:
-            global email
-            global key
             email = input('Enter email for AQS API account:')
             key = input('Enter key for AQS API account with email {0}:'.format(email))
             print('For future use, you can update get_login() function with email and key.')
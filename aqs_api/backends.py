@@ -0,0 +1,240 @@
+__all__ = ['BACKENDS','arrow_column','arrow_frame','to_arrow','from_arrow','aqs_filter_expression','aqs_df_out_arrow','write_csv']
+
+from .schemas import CODE_WIDTHS, get_schema, typed_column
+
+# pyarrow/polars are optional: only needed for the 'arrow'/'polars' backends
+BACKENDS = ['pandas','arrow','polars']
+
+AQS_COLS_OUT = ['dtvar','siteid','parameter_code','sample_measurement',
+                'method_code','sample_duration_code']
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.compute as pc
+    except ImportError:
+        raise ImportError('The arrow/polars backends need pyarrow: pip install pyarrow')
+    return pa, pc
+
+
+def _import_polars():
+    try:
+        import polars as pl
+    except ImportError:
+        raise ImportError('The polars backend needs polars: pip install polars')
+    return pl
+
+
+def arrow_column(name, values, dtype):
+    """
+    Description: builds one Arrow array straight from the parsed values (None/NaN -> null)
+
+    Libraries used
+    ----------
+    pyarrow (as pa)
+
+    Parameters
+    ----------
+    name: str, column name (used for code widths)
+    values: object array (or list) of parsed json values
+    dtype: str, target dtype from the schema
+
+    Returns
+    ----------
+    pa.Array: typed arrow array
+    """
+    pa, pc = _import_pyarrow()
+    if dtype == 'float64':
+        return pa.array(values, type=pa.float64(), from_pandas=True)
+    elif dtype == 'Int64':
+        return pa.array(values, type=pa.int64(), from_pandas=True)
+    elif dtype == 'code':
+        return pa.array(typed_column(name, values, dtype), type=pa.string(), from_pandas=True)
+    elif dtype == 'category':
+        return pa.array(values, type=pa.string(), from_pandas=True).dictionary_encode()
+    return pa.array(values, type=pa.string(), from_pandas=True)
+
+
+def arrow_frame(names, columns, service, backend = 'arrow'):
+    """
+    Description: builds an Arrow table (or polars frame on top of it) from parsed columns
+
+    Libraries used
+    ----------
+    pyarrow (as pa)
+    polars (as pl), for backend='polars'
+
+    Functions used
+    ----------
+    arrow_column()
+    from_arrow()
+
+    Parameters
+    ----------
+    names: list, column names
+    columns: list, parsed values for each column
+    service: str, the name of the service of the type of data to retrieve
+    backend: str, 'arrow' or 'polars'
+
+    Returns
+    ----------
+    pa.Table or pl.DataFrame
+    """
+    pa, pc = _import_pyarrow()
+    schema = get_schema(service)
+    arrays = []
+    for name, values in zip(names, columns):
+        dtype = schema.get(name)
+        if dtype == None:
+            arrays.append(pa.array(values, from_pandas=True))
+            continue
+        try:
+            arrays.append(arrow_column(name, values, dtype))
+        except (pa.ArrowInvalid, pa.ArrowTypeError, TypeError):
+            print('Warning: schema drift for {0}.{1}: values are not {2}'.format(service, name, dtype))
+            arrays.append(pa.array(values, from_pandas=True))
+    return from_arrow(pa.Table.from_arrays(arrays, names=list(names)), backend)
+
+
+def to_arrow(df):
+    """
+    Description: Arrow table from a pandas or polars dataframe (polars is zero-copy)
+
+    Parameters
+    ----------
+    df: pd.DataFrame, pl.DataFrame or pa.Table
+
+    Returns
+    ----------
+    pa.Table
+    """
+    pa, pc = _import_pyarrow()
+    if isinstance(df, pa.Table):
+        return df
+    if hasattr(df, 'to_arrow'):
+        return df.to_arrow()
+    return pa.Table.from_pandas(df, preserve_index=False)
+
+
+def from_arrow(table, backend = 'arrow'):
+    """
+    Description: hands an Arrow table to the chosen backend without copying where possible
+    polars uses the Arrow buffers directly, pandas gets Arrow-backed columns
+
+    Parameters
+    ----------
+    table: pa.Table
+    backend: str, 'pandas', 'arrow' or 'polars'
+
+    Returns
+    ----------
+    pd.DataFrame, pa.Table or pl.DataFrame
+    """
+    if backend == 'arrow':
+        return table
+    elif backend == 'polars':
+        return _import_polars().from_arrow(table)
+    elif backend == 'pandas':
+        import pandas as pd
+        return table.to_pandas(types_mapper=pd.ArrowDtype)
+    print('Error: {0} not in available backends {1}'.format(backend, BACKENDS))
+    return None
+
+
+def aqs_filter_expression():
+    """
+    Description: the aqs_df_out row filter as an Arrow compute expression
+    keeps rows with a measurement and no qualifier (or a V- validation qualifier)
+
+    Libraries used
+    ----------
+    pyarrow.compute (as pc)
+
+    Returns
+    ----------
+    pc.Expression: use with table.filter() or a pyarrow dataset scan
+    """
+    pa, pc = _import_pyarrow()
+    qualifier = pc.field('qualifier')
+    return (pc.field('sample_measurement').is_valid()
+            & (qualifier.is_null() | pc.starts_with(qualifier, 'V')))
+
+
+def aqs_df_out_arrow(table, backend = 'arrow'):
+    """
+    Description: aqs_df_out with Arrow compute: filters missing/bad data,
+    builds dtvar and siteid, converts ppm to ppb and keeps the measurement columns
+
+    Libraries used
+    ----------
+    pyarrow (as pa)
+    pyarrow.compute (as pc)
+
+    Functions used
+    ----------
+    to_arrow()
+    aqs_filter_expression()
+    from_arrow()
+
+    Parameters
+    ----------
+    table: pa.Table or pl.DataFrame of sampleData
+    backend: str, backend for the result. Default 'arrow'
+
+    Returns
+    ----------
+    table: simplified/filtered data sorted by dtvar
+    """
+    pa, pc = _import_pyarrow()
+    table = to_arrow(table).filter(aqs_filter_expression())
+    # pandas string columns come in as large_string
+    dtvar = pc.strptime(pc.binary_join_element_wise(pc.cast(table['date_local'], pa.string()),
+                                                    pc.cast(table['time_local'], pa.string()), ' '),
+                        format='%Y-%m-%d %H:%M', unit='s')
+    # codes may be ints (e.g. read back from csv): cast and zero-pad them first
+    for col, width in CODE_WIDTHS.items():
+        if col in table.column_names:
+            table = table.set_column(table.schema.get_field_index(col), col,
+                                     pc.utf8_lpad(pc.cast(table[col], pa.string()), width=width, padding='0'))
+    siteid = pc.binary_join_element_wise(table['state_code'], table['county_code'],
+                                         table['site_number'], '')
+    ppm = pc.fill_null(pc.equal(table['units_of_measure_code'], '007'), False)
+    measurement = pc.if_else(ppm, pc.multiply(table['sample_measurement'], 1000),
+                             table['sample_measurement'])
+    table = (table.set_column(table.schema.get_field_index('sample_measurement'),
+                              'sample_measurement', measurement)
+                  .append_column('dtvar', dtvar)
+                  .append_column('siteid', siteid))
+    table = table.select(AQS_COLS_OUT).sort_by('dtvar')
+    return from_arrow(table, backend)
+
+
+def write_csv(df, file_name):
+    """
+    Description: writes a result of any backend to csv (get_aqs_data output files)
+
+    Libraries used
+    ----------
+    pyarrow.csv, for backend='arrow'
+
+    Parameters
+    ----------
+    df: pd.DataFrame, pa.Table or pl.DataFrame
+    file_name: str, csv file to write
+
+    Returns
+    ----------
+    (None)
+    """
+    if hasattr(df, 'to_csv'):
+        df.to_csv(file_name, sep = ',', doublequote = False, index=False)
+    elif hasattr(df, 'write_csv'):
+        df.write_csv(file_name)
+    else:
+        pa, pc = _import_pyarrow()
+        from pyarrow import csv
+        # category columns are dictionary encoded, write their values
+        columns = [col.cast(col.type.value_type) if pa.types.is_dictionary(col.type) else col
+                   for col in df.columns]
+        csv.write_csv(pa.Table.from_arrays(columns, names=df.column_names), file_name)
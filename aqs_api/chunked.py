@@ -0,0 +1,229 @@
+__all__ = ['hist_edges','partial_aggregate','merge_partials','aggregate_file','aggregate_files','finalize_aggregate']
+
+from functools import partial
+from multiprocessing import Pool
+import numpy as np
+import pandas as pd
+
+from .utils import site_ids
+
+# Partial aggregates are plain dataframes (one row per group) that can be merged
+# across chunks, files and processes: count/sum/sumsq add up, min/max combine,
+# and the histogram adds up for approximate quantiles. The default bins are
+# log-spaced (fixed relative error), so ppm and ug/m3 data get the same resolution;
+# only occupied bins are kept, as columns h{bin number}
+SITE_CODE_COLS = ['state_code','county_code','site_number']
+
+
+def hist_edges(rel_error = 0.01, lo = 1e-6, hi = 1e6):
+    """
+    Description: histogram bin edges shared by every partial aggregate
+    Bins are log-spaced on each side of zero, so a quantile read from a bin is within
+    rel_error of the true value whatever the units (ppm, ppb, ug/m3, ...)
+    |values| below lo share one bin around zero, values beyond +-hi go in the end bins
+
+    Parameters
+    ----------
+    rel_error: float, relative error of a bin. Default 0.01
+    lo: float, smallest |value| resolved. Default 1e-6
+    hi: float, largest |value| resolved. Default 1e6
+
+    Returns
+    ----------
+    array: bin edges (any increasing edges, e.g. np.linspace, can be passed instead)
+    """
+    gamma = (1 + rel_error)/(1 - rel_error)
+    positive = lo*gamma**np.arange(int(np.ceil(np.log(hi/lo)/np.log(gamma))) + 1)
+    return np.concatenate([-positive[::-1], positive])
+
+
+def partial_aggregate(df, by = ['siteid'], value = 'sample_measurement', edges = None):
+    """
+    Description: mergeable partial aggregate of one chunk of data
+
+    Libraries used
+    ----------
+    numpy (as np)
+    pandas (as pd)
+
+    Functions used
+    ----------
+    site_ids()
+    hist_edges()
+
+    Parameters
+    ----------
+    df: dataframe chunk
+    by: list, columns to group by (siteid is built from the site code columns if missing)
+    value: str, column to aggregate. Default sample_measurement
+    edges: array, optional, histogram bin edges. Default hist_edges()
+
+    Returns
+    ----------
+    df: one row per group with count, sum, sumsq, min, max and histogram columns
+    """
+    if edges is None:
+        edges = hist_edges()
+    if ('siteid' in by) and ('siteid' not in df.columns):
+        df = df.assign(siteid=site_ids(df))
+    values = pd.to_numeric(df[value], errors='coerce').values
+    ok = ~np.isnan(values)
+    groups, uniques = pd.MultiIndex.from_frame(df.loc[ok, by].astype(str)).factorize()
+    values = values[ok]
+    ngroups = len(uniques)
+    out = uniques.to_frame(index=False, name=by)
+    out['count'] = np.bincount(groups, minlength=ngroups)
+    out['sum'] = np.bincount(groups, weights=values, minlength=ngroups)
+    out['sumsq'] = np.bincount(groups, weights=values**2, minlength=ngroups)
+    vmin = np.full(ngroups, np.inf)
+    vmax = np.full(ngroups, -np.inf)
+    np.minimum.at(vmin, groups, values)
+    np.maximum.at(vmax, groups, values)
+    out['min'], out['max'] = vmin, vmax
+    bins = np.clip(np.searchsorted(edges, values, side='right') - 1, 0, len(edges) - 2)
+    used, pos = np.unique(bins, return_inverse=True)
+    nbins = len(used)
+    hist = np.bincount(groups*nbins + pos, minlength=ngroups*nbins).reshape(ngroups, nbins)
+    hist = pd.DataFrame(hist, columns=['h{0}'.format(i) for i in used])
+    return pd.concat([out, hist], axis=1)
+
+
+def merge_partials(partials, by = ['siteid']):
+    """
+    Description: combines partial aggregates (from chunks, files or processes)
+
+    Parameters
+    ----------
+    partials: list of dataframes from partial_aggregate()
+    by: list, group columns
+
+    Returns
+    ----------
+    df: merged partial aggregate
+    """
+    partials = [p for p in partials if p is not None and len(p) > 0]
+    if len(partials) == 0:
+        return None
+    df = pd.concat(partials, ignore_index=True)
+    hist_cols = sorted([col for col in df.columns if col[0] == 'h' and col[1:].isdigit()],
+                       key=lambda col: int(col[1:]))
+    grouped = df.groupby(by, sort=False)
+    stats = grouped.agg(count=('count','sum'), sum=('sum','sum'), sumsq=('sumsq','sum'),
+                        min=('min','min'), max=('max','max'))
+    # histogram summed as one numeric block; bins missing from a partial are NaN (summed as 0)
+    hist = grouped[hist_cols].sum().astype(np.int64)
+    keys = stats.index.to_frame(index=False)
+    return pd.concat([keys, stats.reset_index(drop=True), hist.reset_index(drop=True)], axis=1)
+
+
+def aggregate_file(file_name, by = ['siteid'], value = 'sample_measurement',
+                   edges = None, chunksize = 1000000):
+    """
+    Description: streams one csv file through partial aggregates in chunks,
+    so memory is bounded by chunksize and the number of groups, not the file size
+
+    Functions used
+    ----------
+    partial_aggregate()
+    merge_partials()
+
+    Parameters
+    ----------
+    file_name: str, csv file (get_aqs_data output or a local store partition)
+    by: list, columns to group by
+    value: str, column to aggregate
+    edges: array, optional, histogram bin edges. Default hist_edges()
+    chunksize: int, rows read at a time. Default 1,000,000
+
+    Returns
+    ----------
+    df: partial aggregate for the file
+    """
+    with open(file_name) as f:
+        header = f.readline().strip().split(',')
+    usecols = [col for col in by if col in header] + [value]
+    if ('siteid' in by) and ('siteid' not in header):
+        usecols = usecols + SITE_CODE_COLS
+    total = None
+    for chunk in pd.read_csv(file_name, usecols=usecols, chunksize=chunksize,
+                             dtype={col: str for col in usecols if col != value}):
+        total = merge_partials([total, partial_aggregate(chunk, by, value, edges)], by)
+    return total
+
+
+def aggregate_files(files, by = ['siteid'], value = 'sample_measurement', edges = None,
+                    chunksize = 1000000, processes = 1, quantiles = [0.5, 0.9, 0.98]):
+    """
+    Description: out-of-core aggregation over many files (e.g. years of national sampleData)
+    Each file is aggregated in chunks, files are spread over processes,
+    and the partial aggregates are merged at the end
+
+    Libraries used
+    ----------
+    multiprocessing
+
+    Functions used
+    ----------
+    aggregate_file()
+    merge_partials()
+    finalize_aggregate()
+
+    Parameters
+    ----------
+    files: list of str, csv files to aggregate
+    by: list, columns to group by. Default ['siteid']
+    value: str, column to aggregate. Default sample_measurement
+    edges: array, optional, histogram bin edges. Default hist_edges()
+    chunksize: int, rows read at a time per process. Default 1,000,000
+    processes: int, number of worker processes. Default 1
+    quantiles: list, approximate quantiles to report
+
+    Returns
+    ----------
+    df: per group count, mean, std, min, max and quantiles
+    """
+    if edges is None:
+        edges = hist_edges()
+    work = partial(aggregate_file, by=by, value=value, edges=edges, chunksize=chunksize)
+    if processes > 1:
+        with Pool(processes) as pool:
+            partials = pool.map(work, files)
+    else:
+        partials = [work(f) for f in files]
+    return finalize_aggregate(merge_partials(partials, by), edges, quantiles)
+
+
+def finalize_aggregate(df, edges, quantiles = [0.5, 0.9, 0.98]):
+    """
+    Description: turns a merged partial aggregate into summary statistics
+    Quantiles are interpolated within the histogram bins
+
+    Parameters
+    ----------
+    df: dataframe from merge_partials()
+    edges: array, histogram bin edges used for the partials
+    quantiles: list, quantiles to report
+
+    Returns
+    ----------
+    df: per group count, mean, std, min, max and quantiles (q50, q90, ...)
+    """
+    hist_cols = sorted([col for col in df.columns if col[0] == 'h' and col[1:].isdigit()],
+                       key=lambda col: int(col[1:]))
+    bin_ids = np.array([int(col[1:]) for col in hist_cols])
+    hist = df[hist_cols].fillna(0).values
+    out = df.drop(columns=hist_cols + ['sum','sumsq'])
+    count = df['count'].values
+    out['mean'] = df['sum'].values/count
+    out['std'] = np.sqrt(np.maximum(df['sumsq'].values/count - out['mean'].values**2, 0))
+    cum = np.cumsum(hist, axis=1)
+    for q in quantiles:
+        target = q*count
+        b = np.minimum((cum < target[:, None]).sum(axis=1), len(bin_ids) - 1)
+        below = np.where(b > 0, cum[np.arange(len(b)), b - 1], 0)
+        in_bin = np.maximum(hist[np.arange(len(b)), b], 1)
+        frac = np.clip((target - below)/in_bin, 0, 1)
+        lower, upper = edges[bin_ids[b]], edges[bin_ids[b] + 1]
+        est = lower + frac*(upper - lower)
+        out['q{0:g}'.format(q*100)] = np.clip(est, out['min'].values, out['max'].values)
+    return out
@@ -0,0 +1,285 @@
+__all__ = ['RateLimiter','ResponseCache','CodeCatalog','AQSClient']
+
+import os
+import time
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+import pandas as pd
+
+from .utils import dates_to_1year, drop_unused_params, CODE_DIR
+from .schemas import parse_response
+from .backends import BACKENDS, write_csv
+from .summaries import SUMMARY_SERVICES, derive_summary
+
+HOST = "https://aqs.epa.gov/data/api"
+
+
+class RateLimiter:
+    """
+    Description: spaces out requests to the AQS API (asks for no more than 10 requests
+    a minute, with a 5 second pause between requests)
+    Pass the same RateLimiter to several clients to share one limit (e.g. same account)
+
+    Parameters
+    ----------
+    min_interval: float, seconds between requests. Default 5
+    """
+    def __init__(self, min_interval = 5.0):
+        self.min_interval = min_interval
+        self._lock = threading.Lock()
+        self._next = 0.0
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            wait_time = self._next - now
+            self._next = max(now, self._next) + self.min_interval
+        if wait_time > 0:
+            time.sleep(wait_time)
+
+
+class ResponseCache:
+    """
+    Description: thread-safe cache of API response text keyed by url and parameters
+    (login info is left out of the key so clients can share a cache)
+    Only list responses are cached by default: data responses are large and
+    change as AQS data are revised
+
+    Parameters
+    ----------
+    max_bytes: int, total size of the cached text (oldest dropped first). Default 64 MB
+    services: list, services to cache. Default ['list']. None caches every service
+    max_age: float, seconds a response is served from the cache. Default 1 day
+    """
+    def __init__(self, max_bytes = 64*2**20, services = ['list'], max_age = 86400):
+        self.max_bytes = max_bytes
+        self.services = services
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._items = {}
+        self._size = 0
+
+    @staticmethod
+    def make_key(url, params):
+        return (url,) + tuple(sorted((k, str(v)) for k, v in params.items() if k not in ['email','key']))
+
+    def caches(self, service):
+        return (self.services == None) or (service in self.services)
+
+    def get(self, key):
+        with self._lock:
+            item = self._items.get(key)
+            if item == None:
+                return None
+            text, stored = item
+            if time.monotonic() - stored > self.max_age:
+                del self._items[key]
+                self._size -= len(text)
+                return None
+            return text
+
+    def put(self, key, text):
+        if len(text) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._items:
+                self._size -= len(self._items.pop(key)[0])
+            self._items[key] = (text, time.monotonic())
+            self._size += len(text)
+            while self._size > self.max_bytes:
+                self._size -= len(self._items.pop(next(iter(self._items)))[0])
+
+
+class CodeCatalog:
+    """
+    Description: lazy, thread-safe lookup of the AQS code files in aqs_code_files/
+    One catalog can be shared by every client in a process
+
+    Parameters
+    ----------
+    code_dir: str, optional, folder with the code csv files. Default aqs_api/aqs_code_files
+    """
+    def __init__(self, code_dir = CODE_DIR):
+        self.code_dir = code_dir
+        self._lock = threading.Lock()
+        self._tables = {}
+
+    def table(self, name):
+        """
+        Description: code table by file name (e.g. 'parameters', 'states_and_counties')
+        """
+        with self._lock:
+            if name not in self._tables:
+                self._tables[name] = pd.read_csv(os.path.join(self.code_dir, name + '.csv'), dtype=str)
+            return self._tables[name]
+
+    def param_name(self, param):
+        params = self.table('parameters')
+        match = params.loc[params['Parameter Code'] == str(param), 'Parameter']
+        return match.iloc[0] if len(match) else str(param)
+
+    def state_name(self, state):
+        states = self.table('states_and_counties')
+        match = states.loc[states['State Code'] == str(state).zfill(2), 'State Name']
+        return match.iloc[0] if len(match) else str(state)
+
+
+class AQSClient:
+    """
+    Description: AQS API client that owns its login, output settings and resources
+    Several clients can run in parallel threads. Resources (rate limiter, cache, catalog)
+    are private to the client unless the same object is passed to other clients
+
+    Parameters
+    ----------
+    email: str, email for AQS API account
+    key: str, key for AQS API account
+    directory: str, folder to save files in
+    rate_limiter: RateLimiter, optional. Default new RateLimiter()
+    cache: ResponseCache, optional. Default new ResponseCache() (list responses only).
+        cache=False turns caching off
+    catalog: CodeCatalog, optional. Default new CodeCatalog()
+    pool_size: int, http connections kept open. Default 10
+    """
+    def __init__(self, email, key, directory = '.', rate_limiter = None, cache = None,
+                 catalog = None, pool_size = 10):
+        self.email = email
+        self.key = key
+        self.directory = directory
+        self.rate_limiter = rate_limiter if rate_limiter != None else RateLimiter()
+        self.cache = cache if cache != None else ResponseCache()
+        self.catalog = catalog if catalog != None else CodeCatalog()
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+
+    @classmethod
+    def from_info(cls, info, **kwargs):
+        """
+        Description: client from a user_info style dict (email, key, directory)
+        """
+        return cls(info['email'], info['key'], info.get('directory', '.'), **kwargs)
+
+    def request(self, service, filterservice, **kwargs):
+        """
+        Description: sends one request (through the cache and rate limiter)
+
+        Parameters
+        ----------
+        service: str, the name of the service of the type of data to retrieve
+        filterservice: str, the name of the filterservice
+        **kwargs: dict, parameters for the request
+
+        Returns
+        ----------
+        str: response text
+        """
+        base_url = "/".join([HOST, service, filterservice])
+        predicates = dict({"email": self.email, "key": self.key}, **kwargs)
+        cache_key = ResponseCache.make_key(base_url, predicates)
+        use_cache = bool(self.cache) and self.cache.caches(service)
+        if use_cache:
+            text = self.cache.get(cache_key)
+            if text != None:
+                return text
+        self.rate_limiter.wait()
+        r = self.session.get(base_url, params=predicates)
+        r.raise_for_status()
+        if use_cache:
+            self.cache.put(cache_key, r.text)
+        return r.text
+
+    def get_aqs_lists(self, filterservice, **kwargs):
+        """
+        Description: grabs lists of valid parameters from the AQS API
+
+        Parameters
+        ----------
+        filterservice: str, the name of the filterservice to get a list of
+        **kwargs: dict, necessary parameters for filterservices with required parameters for list
+            backend: str, optional- 'pandas' (default), 'arrow' or 'polars'
+
+        Returns
+        ----------
+        df: a dataframe of possible codes/names
+        """
+        backend = kwargs.pop('backend', 'pandas')
+        return parse_response(self.request('list', filterservice, **kwargs), 'list', backend)
+
+    def get_url(self, service, filterservice, check = True, backend = 'pandas', **kwargs):
+        """
+        Description: gets data from API website based on user-defined services/parameters
+
+        Functions used
+        ----------
+        check_input()
+        drop_unused_params()
+        parse_response()
+
+        Parameters
+        ----------
+        service: str, the name of the service of the type of data to retrieve
+        filterservice: str, the name of the filterservice
+        check: bool, check input and drop unused parameters first. Default True
+        backend: str, 'pandas' (default), 'arrow' or 'polars'
+        **kwargs: dict, necessary parameters for filterservices
+
+        Returns
+        ----------
+        df: a dataframe of the data
+        kwargs: parameters used for the request
+        """
+        from .readin import check_input
+        if check and service != 'list':
+            if check_input(service, filterservice, **kwargs) == 0:
+                return print(':( '*10,'Failed: check input',':( '*10)
+            kwargs = drop_unused_params(service, filterservice, **kwargs)
+        data = parse_response(self.request(service, filterservice, **kwargs), service, backend)
+        return data, kwargs
+
+    def get_aqs_data(self, service, filterservice, derive = False, backend = 'pandas', **kwargs):
+        """
+        Description: takes in user-defined parameters to retrieve AQS data
+        Allows for multiple years of data- API limits to single calendar year
+        Saves one csv per year in the client's directory
+
+        Functions used
+        ----------
+        dates_to_1year()
+        get_url()
+        derive_summary()
+        write_csv()
+
+        Parameters
+        ----------
+        service: str, the name of the service of the type of data to retrieve
+        filterservice: str, the name of the filterservice
+        derive: bool, for dailyData/quarterlyData/annualData, pull sampleData and derive
+        the summary locally (with pandas). Default False
+        backend: str, 'pandas' (default), 'arrow' or 'polars' for every year
+        **kwargs: dict, necessary parameters for filterservices
+
+        Returns
+        ----------
+        list: files written
+        """
+        param = self.catalog.param_name(kwargs['param']).replace(' ', '_')
+        state = self.catalog.state_name(kwargs.get('state', '')).replace(' ', '_')
+        if backend not in BACKENDS:
+            print('Error: {0} not in available backends {1}'.format(backend, BACKENDS))
+            return None
+        bdates, edates = dates_to_1year(kwargs['bdate'], kwargs['edate'])
+        files = []
+        for count, (start, end) in enumerate(zip(bdates, edates)):
+            kwargs['bdate'], kwargs['edate'] = start, end
+            if derive and (service in SUMMARY_SERVICES):
+                df_temp, kwargs = self.get_url('sampleData', filterservice, check=(count == 0), **kwargs)
+                df_temp = derive_summary(df_temp, service)
+            else:
+                df_temp, kwargs = self.get_url(service, filterservice, check=(count == 0),
+                                               backend=backend, **kwargs)
+            file_out = os.path.join(self.directory, '{0}_{1}_{2}.csv'.format(start[:4], param, state))
+            write_csv(df_temp, file_out)
+            files.append(file_out)
+        return files
@@ -0,0 +1,258 @@
+__all__ = ['duration_hours','frequency_days','duration_table','frequency_table','sample_frequency_days','completeness_report','refetch_plan']
+
+import os
+import re
+import numpy as np
+import pandas as pd
+
+from .utils import site_ids, sample_datetimes, CODE_DIR
+
+GROUP_COLS = ['siteid','parameter_code','poc','sample_duration_code','year']
+ORDINAL_DAYS = {'OTHER':2}
+# sample_frequency values in sampleData that collection_frequencies.csv doesn't list
+EXTRA_FREQUENCY_DAYS = {'HOURLY':1}
+
+
+def duration_hours(description):
+    """
+    Description: hours covered by one sample from a durations.csv description
+    e.g. '1 HOUR' -> 1, '3 HOURS' -> 3, '5 MINUTE' -> 1/12, '24-HR BLK AVG' -> 24, '1 WEEK' -> 168
+
+    Parameters
+    ----------
+    description: str, duration description
+
+    Returns
+    ----------
+    float: hours (NaN if not a fixed duration, e.g. COMPOSITE DATA)
+    """
+    match = re.search(r'(\d+)[ -]*(MINUTE|HOUR|HR|WEEK|MONTH)', str(description).upper())
+    if match == None:
+        return np.nan
+    hours = {'MINUTE':1/60, 'HOUR':1, 'HR':1, 'WEEK':168, 'MONTH':730}
+    return int(match.group(1))*hours[match.group(2)]
+
+
+def frequency_days(description):
+    """
+    Description: days between sampling days from a collection frequency description
+    e.g. 'EVERY DAY'/'HOURLY' -> 1, 'EVERY OTHER DAY' -> 2, 'EVERY 6TH DAY' -> 6, 'EVERY 30 DAYS' -> 30
+
+    Parameters
+    ----------
+    description: str, frequency description (collection_frequencies.csv or sample_frequency)
+
+    Returns
+    ----------
+    float: days (NaN for random/episodic/seasonal schedules)
+    """
+    description = str(description).upper()
+    if description.startswith('DAILY') or description in ['EVERY DAY','HOURLY']:
+        return 1
+    match = re.search(r'EVERY (\d+|OTHER)', description)
+    if match == None:
+        return np.nan
+    return ORDINAL_DAYS.get(match.group(1)) or int(match.group(1))
+
+
+def duration_table():
+    """
+    Description: durations.csv with the hours covered by one sample
+
+    Returns
+    ----------
+    df: Duration Code, Duration Description, hours
+    """
+    durations = pd.read_csv(os.path.join(CODE_DIR, 'durations.csv'), dtype=str)
+    durations['hours'] = durations['Duration Description'].map(duration_hours)
+    return durations
+
+
+def frequency_table():
+    """
+    Description: collection_frequencies.csv with the days between sampling days
+
+    Returns
+    ----------
+    df: Frequency Code, Frequency Description, days
+    """
+    frequencies = pd.read_csv(os.path.join(CODE_DIR, 'collection_frequencies.csv'), dtype=str)
+    frequencies['days'] = frequencies['Frequency Description'].map(frequency_days)
+    return frequencies
+
+
+def sample_frequency_days(frequency):
+    """
+    Description: days between sampling days for each row's sample_frequency, looked up in
+    collection_frequencies.csv (days from frequency_days() on the table's descriptions)
+    Descriptions the table doesn't know are parsed with frequency_days() and reported
+
+    Functions used
+    ----------
+    frequency_table()
+    frequency_days()
+
+    Parameters
+    ----------
+    frequency: series of sample_frequency descriptions
+
+    Returns
+    ----------
+    array: days for each row (NaN for missing or non-periodic schedules)
+    """
+    table = frequency_table()
+    known = dict(zip(table['Frequency Description'].str.strip().str.upper(), table['days']))
+    known.update(EXTRA_FREQUENCY_DAYS)
+    codes, uniques = pd.factorize(frequency)
+    descriptions = [str(desc).strip().upper() for desc in uniques]
+    unknown = [desc for desc in descriptions if desc not in known]
+    if len(unknown) > 0:
+        print('Warning: sample frequencies not in collection_frequencies.csv {0}'.format(unknown))
+    days = np.array([known[desc] if desc in known else frequency_days(desc) for desc in descriptions] + [np.nan],
+                    dtype=float)
+    return days[codes]
+
+
+def completeness_report(df, bdate = None, edate = None):
+    """
+    Description: observed/expected counts and gap runs per site, parameter, poc, duration and year
+    The expected schedule comes from the sample duration (durations.csv) and
+    sample frequency (collection_frequencies.csv). Gaps are found with a sorted diff,
+    no python loop over sites
+
+    Libraries used
+    ----------
+    numpy (as np)
+    pandas (as pd)
+
+    Functions used
+    ----------
+    site_ids()
+    sample_datetimes()
+    duration_table()
+    sample_frequency_days()
+
+    Parameters
+    ----------
+    df: dataframe of sampleData pulled from AQS API
+    bdate: str, optional, first date requested (YYYYMMDD). Default start of each year
+    edate: str, optional, final date requested (YYYYMMDD). Default end of each year
+    (expected counts and gaps only cover bdate-edate, samples outside it are dropped)
+
+    Returns
+    ----------
+    df: report- one row per group with step, observed, expected and percent complete
+    df: gaps- one row per gap with gap_start, gap_end and missing samples
+    """
+    dtvar = sample_datetimes(df)
+    inside = np.ones(len(df), dtype=bool)
+    if bdate != None:
+        inside &= (dtvar >= pd.to_datetime(bdate, format='%Y%m%d')).values
+    if edate != None:
+        inside &= (dtvar < pd.to_datetime(edate, format='%Y%m%d') + pd.Timedelta(days=1)).values
+    df, dtvar = df.loc[inside].reset_index(drop=True), dtvar[inside].reset_index(drop=True)
+    durations = duration_table().set_index('Duration Code')['hours']
+    keys = pd.DataFrame({'siteid': site_ids(df),
+                         'parameter_code': df['parameter_code'].astype(str),
+                         'poc': df['poc'].astype(str),
+                         'sample_duration_code': df['sample_duration_code'].astype(str)})
+    keys['year'] = dtvar.dt.year.values
+    hours = keys['sample_duration_code'].map(durations).values.astype(float)
+    if 'sample_frequency' in df.columns:
+        freq = sample_frequency_days(df['sample_frequency'])
+    else:
+        freq = np.ones(len(df))
+    freq = np.where(np.isnan(freq), 1, freq)
+    groups, uniques = pd.MultiIndex.from_frame(keys).factorize()
+    report = uniques.to_frame(index=False, name=list(keys.columns))
+    ngroups = len(report)
+    # schedule of each group (duration is part of the key, frequency taken as the longest seen)
+    group_hours = np.full(ngroups, np.nan)
+    group_hours[groups] = hours
+    group_freq = np.zeros(ngroups)
+    np.maximum.at(group_freq, groups, freq)
+    slot = np.where(np.isnan(group_hours), 24, group_hours)
+    step_hours = np.where(slot < 24, np.where(group_freq > 1, 24*group_freq, slot), np.maximum(slot, 24*group_freq))
+    step = (step_hours*3600e9).astype(np.int64)
+    # observed: unique sample times per group
+    t = dtvar.values.astype('datetime64[ns]').astype(np.int64)
+    order = np.lexsort((t, groups))
+    g, t = groups[order], t[order]
+    new = np.ones(len(t), dtype=bool)
+    new[1:] = (g[1:] != g[:-1]) | (t[1:] != t[:-1])
+    g, t = g[new], t[new]
+    observed = np.bincount(g, minlength=ngroups)
+    # period of each group: the year, clipped to bdate-edate (end is exclusive)
+    year_start = pd.to_datetime(pd.DataFrame({'year': report['year'], 'month': 1, 'day': 1}))
+    year_end = pd.to_datetime(pd.DataFrame({'year': report['year'] + 1, 'month': 1, 'day': 1}))
+    period_start = year_start.values.astype('datetime64[ns]').astype(np.int64)
+    period_end = year_end.values.astype('datetime64[ns]').astype(np.int64)
+    if bdate != None:
+        period_start = np.maximum(period_start, pd.to_datetime(bdate, format='%Y%m%d').value)
+    if edate != None:
+        period_end = np.minimum(period_end, (pd.to_datetime(edate, format='%Y%m%d') + pd.Timedelta(days=1)).value)
+    # expected: sampling days in the period x samples per sampling day
+    days = (period_end - period_start)/(24*3600e9)
+    per_day = np.where(slot < 24, 24/slot, 1)
+    expected = np.where(slot <= 24, np.ceil(days/np.maximum(group_freq, 1))*per_day, np.floor(days*24/slot))
+    report['step_hours'] = step_hours
+    report['observed'] = observed
+    report['expected'] = expected.astype(np.int64)
+    report['percent_complete'] = np.round(100*np.minimum(observed/expected, 1), 1)
+    # gaps: between samples, before the first and after the last sample of the period
+    first = np.ones(len(t), dtype=bool)
+    first[1:] = g[1:] != g[:-1]
+    last = np.ones(len(t), dtype=bool)
+    last[:-1] = g[1:] != g[:-1]
+    prev_t = np.where(first, period_start[g] - step[g], np.roll(t, 1))
+    gap_starts = [prev_t + step[g]]
+    gap_ends = [t - step[g]]
+    gap_groups = [g]
+    gap_starts.append(t[last] + step[g[last]])
+    gap_ends.append(period_end[g[last]] - step[g[last]])
+    gap_groups.append(g[last])
+    gap_start, gap_end, gap_group = map(np.concatenate, (gap_starts, gap_ends, gap_groups))
+    missing = (gap_end - gap_start)//step[gap_group] + 1
+    is_gap = missing > 0
+    gaps = report.loc[gap_group[is_gap], GROUP_COLS].reset_index(drop=True)
+    gaps['gap_start'] = pd.to_datetime(gap_start[is_gap])
+    gaps['gap_end'] = pd.to_datetime(gap_end[is_gap])
+    gaps['missing'] = missing[is_gap]
+    gaps = gaps.sort_values(by=['siteid','parameter_code','poc','gap_start'], ignore_index=True)
+    return report, gaps
+
+
+def refetch_plan(gaps, service = 'sampleData', min_missing = 1):
+    """
+    Description: turns gap spans into get_url requests (one per site/parameter/date span,
+    overlapping or touching day spans merged)
+    use: for request in plan: get_url(request.pop('service'), request.pop('filterservice'), count=0, **request)
+
+    Parameters
+    ----------
+    gaps: dataframe of gaps from completeness_report()
+    service: str, service to re-fetch from. Default sampleData
+    min_missing: int, skip gaps with fewer missing samples. Default 1
+
+    Returns
+    ----------
+    list: dicts of get_url input (service, filterservice, state, county, site, param, bdate, edate)
+    """
+    gaps = gaps.loc[gaps['missing'] >= min_missing]
+    spans = pd.DataFrame({'siteid': gaps['siteid'], 'param': gaps['parameter_code'],
+                          'bdate': gaps['gap_start'].dt.normalize(),
+                          'edate': gaps['gap_end'].dt.normalize()})
+    spans = spans.sort_values(by=['siteid','param','bdate'], ignore_index=True)
+    # merge spans: a new run starts when the span begins after the furthest end so far (+1 day)
+    same = (spans['siteid'] == spans['siteid'].shift()) & (spans['param'] == spans['param'].shift())
+    reach = spans.groupby(['siteid','param'])['edate'].cummax().groupby([spans['siteid'], spans['param']]).shift()
+    new_run = ~same | (spans['bdate'] > reach + pd.Timedelta(days=1))
+    spans['run'] = new_run.cumsum()
+    runs = spans.groupby('run').agg(siteid=('siteid','first'), param=('param','first'),
+                                    bdate=('bdate','min'), edate=('edate','max'))
+    plan = []
+    for siteid, param, bdate, edate in zip(runs['siteid'], runs['param'], runs['bdate'], runs['edate']):
+        plan.append({'service': service, 'filterservice': 'bySite', 'param': param,
+                     'state': siteid[:2], 'county': siteid[2:5], 'site': siteid[5:],
+                     'bdate': bdate.strftime('%Y%m%d'), 'edate': edate.strftime('%Y%m%d')})
+    return plan
@@ -0,0 +1,440 @@
+__all__ = ['store_dir','store_data','read_index','query_local','covered_spans','uncovered_spans','add_coverage']
+
+import os
+import io
+import datetime as dt
+import numpy as np
+import pandas as pd
+
+from .utils import site_ids, sample_datetimes, dates_to_1year
+from .schemas import CODE_WIDTHS, pad_codes
+from .merge import obs_hash, content_hash, revision_times, drop_duplicate_obs, NO_REVISION
+from .user_info import info
+
+# Layout of the local store (under info['directory']):
+#   store/{service}/{param}/{year}.csv  -> rows sorted by siteid, dtvar in blocks
+#   store/{service}/{param}/index.csv   -> one line per (siteid, block) with byte ranges
+#   store/coverage.csv                  -> date spans already pulled per service/param/geography
+INDEX_COLS = ['siteid','file','byte_start','byte_stop','nrows','dt_min','dt_max']
+COVERAGE_COLS = ['service','param','geo','bdate','edate']
+# code columns are read back as strings so '007' doesn't become 7
+READ_DTYPES = dict({'siteid':str}, **{col: str for col in CODE_WIDTHS})
+
+
+def store_dir(service = None, param = None, directory = None):
+    """
+    Description: path to the local store (or a service/param partition in it)
+
+    Parameters
+    ----------
+    service: str, optional, AQS service name (e.g. sampleData)
+    param: str, optional, AQS parameter code
+    directory: str, optional, base directory. Default is info['directory']
+
+    Returns
+    ----------
+    str: path to folder (ends with /)
+    """
+    if directory == None:
+        directory = info['directory']
+    path = os.path.join(directory, 'store')
+    if service != None:
+        path = os.path.join(path, service)
+    if param != None:
+        path = os.path.join(path, str(param))
+    return path + os.sep
+
+
+def _write_blocks(df, file_path, header):
+    """
+    Description: appends rows to a partition file one site block at a time,
+    keeping track of the byte range of each block for the index
+
+    Parameters
+    ----------
+    df: dataframe sorted by siteid, dtvar
+    file_path: str, partition csv
+    header: list, column order of the partition file
+
+    Returns
+    ----------
+    df: index rows for the blocks written
+    """
+    new_file = not os.path.exists(file_path)
+    rows = []
+    with open(file_path, 'ab') as f:
+        if new_file:
+            f.write((','.join(header) + '\n').encode())
+        start = f.tell()
+        for siteid, block in df.groupby('siteid', sort=False):
+            text = block[header].to_csv(header=False, index=False, date_format='%Y-%m-%d %H:%M')
+            f.write(text.encode())
+            stop = f.tell()
+            rows.append([siteid, os.path.basename(file_path), start, stop, len(block),
+                         block['dtvar'].iloc[0], block['dtvar'].iloc[-1]])
+            start = stop
+    return pd.DataFrame(rows, columns=INDEX_COLS)
+
+
+def read_index(service, param, directory = None):
+    """
+    Description: reads the (siteid, time) block index for a service/param partition
+
+    Parameters
+    ----------
+    service: str, AQS service name
+    param: str, AQS parameter code
+    directory: str, optional, base directory. Default is info['directory']
+
+    Returns
+    ----------
+    df: index of blocks (empty if nothing stored yet)
+    """
+    index_file = store_dir(service, param, directory) + 'index.csv'
+    if not os.path.exists(index_file):
+        return pd.DataFrame(columns=INDEX_COLS)
+    return pd.read_csv(index_file, dtype={'siteid':str,'file':str}, parse_dates=['dt_min','dt_max'])
+
+
+def _read_keys(key_file):
+    """
+    Description: reads the hash keys, revisions and content hashes of a partition
+    (aligned with its rows)
+    """
+    if not os.path.exists(key_file):
+        return np.array([], dtype=np.uint64), np.array([], dtype=np.int64), np.array([], dtype=np.uint64)
+    keys = np.load(key_file)
+    if 'content' not in keys.files:
+        return keys['keys'], keys['rev'], np.zeros(len(keys['keys']), dtype=np.uint64)
+    return keys['keys'], keys['rev'], keys['content']
+
+
+def store_data(df, service, param = None, directory = None):
+    """
+    Description: adds data pulled from the API to the local store
+    Rows are split into per-year partition files and written as per-site blocks
+    so queries can read only the byte ranges they need
+    Repeated observations are upserted (latest revision wins) using the hash keys
+    kept next to each partition: new observations are appended without reading the
+    partition, identical re-pulls are skipped, and only partitions with rows whose
+    values changed (and are not an older revision) are rewritten
+
+    Libraries used
+    ----------
+    pandas (as pd)
+    numpy (as np)
+
+    Functions used
+    ----------
+    site_ids()
+    sample_datetimes()
+    obs_hash()
+    content_hash()
+    revision_times()
+    drop_duplicate_obs()
+    read_index()
+
+    Parameters
+    ----------
+    df: dataframe- data pulled from AQS API (get_url output)
+    service: str, AQS service name
+    param: str, optional, AQS parameter code. Default uses parameter_code column
+    directory: str, optional, base directory. Default is info['directory']
+
+    Returns
+    ----------
+    int: number of rows written (new or revised)
+    """
+    if len(df) == 0:
+        return 0
+    df = df.copy()
+    df['siteid'] = site_ids(df)
+    df['dtvar'] = sample_datetimes(df)
+    if param == None:
+        param = str(df['parameter_code'].iloc[0])
+    path = store_dir(service, param, directory)
+    os.makedirs(path, exist_ok=True)
+    df = drop_duplicate_obs(df)
+    df = df.sort_values(by=['siteid','dtvar'], ignore_index=True)
+    index = read_index(service, param, directory)
+    new_index = []
+    written = 0
+    for year, part in df.groupby(df['dtvar'].dt.year):
+        part = part.reset_index(drop=True)
+        file_name = '{0}.csv'.format(year)
+        file_path = path + file_name
+        key_file = '{0}{1}.keys.npz'.format(path, year)
+        old_keys, old_rev, old_content = _read_keys(key_file)
+        if os.path.exists(file_path):
+            with open(file_path) as f:
+                header = f.readline().strip().split(',')
+        else:
+            header = list(part.columns)
+        keys, rev = obs_hash(part), revision_times(part)
+        content = content_hash(part, [col for col in header if col not in ['siteid','dtvar']])
+        # match new rows against stored keys
+        found = np.zeros(len(keys), dtype=bool)
+        newer = np.zeros(len(keys), dtype=bool)
+        if len(old_keys) > 0:
+            order = np.argsort(old_keys)
+            stored = order[np.searchsorted(old_keys[order], keys) % len(order)]
+            found = old_keys[stored] == keys
+            # a stored row is replaced only by a later revision with different values
+            # (rows without a revision date are replaced when their values changed)
+            later = (rev > old_rev[stored]) | (rev == NO_REVISION) | (old_rev[stored] == NO_REVISION)
+            newer = found & (content != old_content[stored]) & later
+        novel = ~found
+        if newer.any():
+            # revised rows: rewrite this partition only
+            replaced = np.isin(old_keys, keys[newer])
+            old = pad_codes(pd.read_csv(file_path, dtype=READ_DTYPES, parse_dates=['dtvar']))
+            keep = ~replaced
+            part = pd.concat([frame for frame in [old.loc[keep], part.loc[novel|newer].reindex(columns=header)]
+                              if len(frame) > 0], ignore_index=True)
+            keys = np.concatenate([old_keys[keep], keys[novel|newer]])
+            rev = np.concatenate([old_rev[keep], rev[novel|newer]])
+            content = np.concatenate([old_content[keep], content[novel|newer]])
+            order = np.lexsort((part['dtvar'].values, part['siteid'].values))
+            part, keys, rev, content = part.iloc[order].reset_index(drop=True), keys[order], rev[order], content[order]
+            os.remove(file_path)
+            index = index.loc[index['file'] != file_name]
+            written += int((novel|newer).sum())
+        else:
+            if not novel.any():
+                continue
+            part, keys, rev, content = part.loc[novel].reset_index(drop=True), keys[novel], rev[novel], content[novel]
+            keys, rev = np.concatenate([old_keys, keys]), np.concatenate([old_rev, rev])
+            content = np.concatenate([old_content, content])
+            written += int(novel.sum())
+        if len(part) > 0:
+            new_index.append(_write_blocks(part.reindex(columns=header), file_path, header))
+        np.savez(key_file, keys=keys, rev=rev, content=content)
+    frames = [frame for frame in [index] + new_index if len(frame) > 0]
+    index = pd.concat(frames, ignore_index=True) if len(frames) > 0 else pd.DataFrame(columns=INDEX_COLS)
+    index.to_csv(path + 'index.csv', index=False, date_format='%Y-%m-%d %H:%M')
+    return written
+
+
+def _read_blocks(path, blocks, columns = None):
+    """
+    Description: reads only the byte ranges listed in blocks from the partition files
+
+    Parameters
+    ----------
+    path: str, partition folder
+    blocks: dataframe, rows of the index to read
+    columns: list, optional, columns to parse (siteid and dtvar are always parsed)
+
+    Returns
+    ----------
+    df: rows from the requested blocks
+    """
+    frames = []
+    for file_name, file_blocks in blocks.groupby('file'):
+        with open(path + file_name, 'rb') as f:
+            header = f.readline()
+            chunks = [header]
+            names = header.decode().strip().split(',')
+            for start, stop in zip(file_blocks['byte_start'], file_blocks['byte_stop']):
+                f.seek(int(start))
+                chunks.append(f.read(int(stop) - int(start)))
+        usecols = None
+        if columns != None:
+            usecols = ['siteid','dtvar'] + [c for c in columns if (c in names) and (c not in ['siteid','dtvar'])]
+        frames.append(pad_codes(pd.read_csv(io.BytesIO(b''.join(chunks)), usecols=usecols,
+                                            dtype=READ_DTYPES, parse_dates=['dtvar'])))
+    if len(frames) == 0:
+        # nothing stored for the request: empty frame with the columns asked for
+        names = [c for c in (columns or []) if c not in ['siteid','dtvar']]
+        empty = pd.DataFrame({'siteid': pd.Series(dtype=str), 'dtvar': pd.Series(dtype='datetime64[ns]')})
+        return empty.reindex(columns=['siteid','dtvar'] + names)
+    return pd.concat(frames, ignore_index=True)
+
+
+def _geo_key(state = None, county = None, site = None):
+    """
+    Description: builds the siteid prefix for a geography (state, state+county, or full site)
+    """
+    geo = ''
+    if state != None:
+        geo += str(state).zfill(2)
+        if county != None:
+            geo += str(county).zfill(3)
+            if site != None:
+                geo += str(site).zfill(4)
+    return geo
+
+
+def _read_coverage(directory = None):
+    coverage_file = store_dir(directory=directory) + 'coverage.csv'
+    if not os.path.exists(coverage_file):
+        return pd.DataFrame(columns=COVERAGE_COLS)
+    return pd.read_csv(coverage_file, dtype=str)
+
+
+def add_coverage(service, param, geo, bdate, edate, directory = None):
+    """
+    Description: records that a date span has been pulled for a service/param/geography
+
+    Parameters
+    ----------
+    service: str, AQS service name
+    param: str, AQS parameter code
+    geo: str, siteid prefix for the geography ('' for all, '24' for Maryland, ...)
+    bdate: str, first date pulled (YYYYMMDD)
+    edate: str, final date pulled (YYYYMMDD)
+    directory: str, optional, base directory. Default is info['directory']
+
+    Returns
+    ----------
+    (None)
+    """
+    coverage = _read_coverage(directory)
+    row = pd.DataFrame([[service, str(param), geo, bdate, edate]], columns=COVERAGE_COLS)
+    coverage = pd.concat([coverage, row], ignore_index=True) if len(coverage) > 0 else row
+    os.makedirs(store_dir(directory=directory), exist_ok=True)
+    coverage.to_csv(store_dir(directory=directory) + 'coverage.csv', index=False)
+
+
+def covered_spans(service, param, geo, directory = None):
+    """
+    Description: merged list of date spans already stored for a geography
+    A span pulled for a state also covers every county/site in it
+
+    Parameters
+    ----------
+    service: str, AQS service name
+    param: str, AQS parameter code
+    geo: str, siteid prefix for the geography
+    directory: str, optional, base directory. Default is info['directory']
+
+    Returns
+    ----------
+    list: (bdate, edate) datetime pairs, sorted and non-overlapping
+    """
+    coverage = _read_coverage(directory)
+    coverage = coverage.fillna('')
+    match = ((coverage['service'] == service) & (coverage['param'] == str(param))
+             & coverage['geo'].apply(lambda g: geo.startswith(g)))
+    spans = sorted((dt.datetime.strptime(b, '%Y%m%d'), dt.datetime.strptime(e, '%Y%m%d'))
+                   for b, e in zip(coverage.loc[match,'bdate'], coverage.loc[match,'edate']))
+    merged = []
+    for start, end in spans:
+        if merged and start <= merged[-1][1] + dt.timedelta(days=1):
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def uncovered_spans(service, param, geo, bdate, edate, directory = None):
+    """
+    Description: date spans in bdate-edate that are not in the local store yet
+
+    Functions used
+    ----------
+    covered_spans()
+
+    Parameters
+    ----------
+    service: str, AQS service name
+    param: str, AQS parameter code
+    geo: str, siteid prefix for the geography
+    bdate: str, first date (YYYYMMDD)
+    edate: str, final date (YYYYMMDD)
+    directory: str, optional, base directory. Default is info['directory']
+
+    Returns
+    ----------
+    list: (bdate, edate) str pairs (YYYYMMDD) that still need to be pulled
+    """
+    start = dt.datetime.strptime(bdate, '%Y%m%d')
+    end = dt.datetime.strptime(edate, '%Y%m%d')
+    gaps = []
+    for cov_start, cov_end in covered_spans(service, param, geo, directory):
+        if cov_end < start or cov_start > end:
+            continue
+        if cov_start > start:
+            gaps.append((start, cov_start - dt.timedelta(days=1)))
+        start = max(start, cov_end + dt.timedelta(days=1))
+    if start <= end:
+        gaps.append((start, end))
+    return [(s.strftime('%Y%m%d'), e.strftime('%Y%m%d')) for s, e in gaps]
+
+
+def query_local(service, param, bdate, edate, state = None, county = None, site = None,
+                columns = None, fetch = True, directory = None):
+    """
+    Description: answers a data request from the local store
+    Only the site blocks that overlap the request are read from disk (via the index)
+    Date spans not stored yet are pulled from the API (get_url) and added to the store first
+
+    Libraries used
+    ----------
+    pandas (as pd)
+
+    Functions used
+    ----------
+    uncovered_spans()
+    get_url()
+    store_data()
+    add_coverage()
+    read_index()
+
+    Parameters
+    ----------
+    service: str, AQS service name (e.g. sampleData)
+    param: str, AQS parameter code
+    bdate: str, first date to retrieve data for (YYYYMMDD)
+    edate: str, final date to retrieve data for (YYYYMMDD)
+    state: str, optional, state code
+    county: str, optional, county code (needs state)
+    site: str, optional, site number (needs state and county)
+    columns: list, optional, columns to return (siteid and dtvar are always included)
+    fetch: bool, pull uncovered date spans from the API. Default True
+    directory: str, optional, base directory. Default is info['directory']
+
+    Returns
+    ----------
+    df: stored rows for the request, sorted by siteid, dtvar
+    (empty frame with siteid, dtvar and columns if nothing is stored, None if the geography is not valid)
+    """
+    from .readin import get_url
+    param = str(param)
+    if ((county != None) and (state == None)) or ((site != None) and (county == None)):
+        print('Error: county needs state, and site needs state and county')
+        return None
+    if fetch and (state == None):
+        print('Error: fetch=True needs at least a state to pull missing dates (or use fetch=False)')
+        return None
+    geo = _geo_key(state, county, site)
+    if fetch:
+        if site != None: filterservice = 'bySite'
+        elif county != None: filterservice = 'byCounty'
+        else: filterservice = 'byState'
+        for gap_start, gap_end in uncovered_spans(service, param, geo, bdate, edate, directory):
+            bdates, edates = dates_to_1year(gap_start, gap_end)
+            for start, end in zip(bdates, edates):
+                kwargs = {'param':param, 'bdate':start, 'edate':end}
+                for key, value in zip(['state','county','site'], [state, county, site]):
+                    if value != None:
+                        kwargs[key] = value
+                result = get_url(service, filterservice, count=0, **kwargs)
+                if result == None:
+                    print('Failed to pull {0} - {1}, not added to the store'.format(start, end))
+                    continue
+                data, kwargs = result
+                store_data(data, service, param, directory)
+                add_coverage(service, param, geo, start, end, directory)
+    start = pd.Timestamp(dt.datetime.strptime(bdate, '%Y%m%d'))
+    end = pd.Timestamp(dt.datetime.strptime(edate, '%Y%m%d')) + pd.Timedelta(days=1)
+    index = read_index(service, param, directory)
+    blocks = index.loc[index['siteid'].str.startswith(geo)
+                       & (index['dt_max'] >= start) & (index['dt_min'] < end)]
+    df = _read_blocks(store_dir(service, param, directory), blocks, columns)
+    if len(df) == 0:
+        return df
+    df = df.loc[(df['dtvar'] >= start) & (df['dtvar'] < end)]
+    if columns != None:
+        df = df[['siteid','dtvar'] + [c for c in df.columns if c not in ['siteid','dtvar']]]
+    return df.sort_values(by=['siteid','dtvar'], ignore_index=True)
@@ -0,0 +1,149 @@
+__all__ = ['KEY_COLS','obs_hash','content_hash','revision_times','drop_duplicate_obs','merge_files']
+
+import numpy as np
+import pandas as pd
+
+from .utils import site_ids, sample_datetimes
+from .schemas import CODE_WIDTHS, pad_codes
+
+# Columns that identify a single observation
+# pollutant_standard/event_type are only in the daily/annual services and split rows there
+KEY_COLS = ['siteid','poc','parameter_code','method_code','sample_duration_code','dtvar']
+EXTRA_KEY_COLS = ['pollutant_standard','event_type']
+NO_REVISION = np.iinfo(np.int64).min
+
+
+def obs_hash(df):
+    """
+    Description: computes a 64-bit hash key per observation from
+    site, poc, parameter, method, sample duration and datetime
+    Codes are normalized first so '007' and 7 give the same key
+
+    Libraries used
+    ----------
+    pandas (as pd)
+    numpy (as np)
+
+    Functions used
+    ----------
+    site_ids()
+    sample_datetimes()
+
+    Parameters
+    ----------
+    df: dataframe of data pulled from AQS API (siteid/dtvar are built if missing)
+
+    Returns
+    ----------
+    array: uint64 hash key for each row
+    """
+    keys = pd.DataFrame(index=df.index)
+    keys['siteid'] = df['siteid'] if 'siteid' in df.columns else site_ids(df)
+    dtvar = df['dtvar'] if 'dtvar' in df.columns else sample_datetimes(df)
+    keys['dtvar'] = pd.to_datetime(dtvar).values.astype('datetime64[ns]').astype('int64')
+    for col in KEY_COLS[1:-1] + EXTRA_KEY_COLS:
+        if col in df.columns:
+            keys[col] = df[col].astype(str).str.lstrip('0')
+    return pd.util.hash_pandas_object(keys, index=False).values
+
+
+def content_hash(df, columns = None):
+    """
+    Description: 64-bit hash of the values in each row, used to tell a revised row
+    from an identical re-pull of the same observation
+
+    Libraries used
+    ----------
+    pandas (as pd)
+
+    Parameters
+    ----------
+    df: dataframe of data pulled from AQS API
+    columns: list, optional, columns to hash. Default all columns except siteid/dtvar
+
+    Returns
+    ----------
+    array: uint64 hash of each row
+    """
+    if columns is None:
+        columns = [col for col in df.columns if col not in ['siteid','dtvar']]
+    values = df.reindex(columns=sorted(columns)).astype(str)
+    return pd.util.hash_pandas_object(values, index=False).values
+
+
+def revision_times(df):
+    """
+    Description: revision time of each row (date_of_last_change) as int64
+    Rows without a revision date get NO_REVISION
+
+    Parameters
+    ----------
+    df: dataframe of data pulled from AQS API
+
+    Returns
+    ----------
+    array: int64 revision times (ns)
+    """
+    if 'date_of_last_change' not in df.columns:
+        return np.full(len(df), NO_REVISION, dtype=np.int64)
+    rev = pd.to_datetime(df['date_of_last_change'], errors='coerce')
+    return np.where(rev.isna(), NO_REVISION, rev.values.astype('datetime64[ns]').astype('int64'))
+
+
+def drop_duplicate_obs(df, keys = None, rev = None):
+    """
+    Description: drops repeated observations, keeping the latest revision
+    (ties go to the row that comes last, i.e. the most recent pull)
+
+    Functions used
+    ----------
+    obs_hash()
+    revision_times()
+
+    Parameters
+    ----------
+    df: dataframe of data pulled from AQS API
+    keys: array, optional, precomputed obs_hash(df)
+    rev: array, optional, precomputed revision_times(df)
+
+    Returns
+    ----------
+    df: dataframe with one row per observation
+    """
+    if keys is None:
+        keys = obs_hash(df)
+    if rev is None:
+        rev = revision_times(df)
+    order = np.lexsort((np.arange(len(df)), rev, keys))
+    last = np.ones(len(order), dtype=bool)
+    last[:-1] = keys[order][1:] != keys[order][:-1]
+    keep = np.sort(order[last])
+    return df.iloc[keep].reset_index(drop=True)
+
+
+def merge_files(files):
+    """
+    Description: merges csv files from overlapping pulls (e.g. get_aqs_data output)
+    into one dataframe without repeated observations
+
+    Libraries used
+    ----------
+    pandas (as pd)
+
+    Functions used
+    ----------
+    pad_codes()
+    drop_duplicate_obs()
+
+    Parameters
+    ----------
+    files: list of str, csv files in the order they were pulled (oldest first)
+
+    Returns
+    ----------
+    df: merged dataframe, latest revision of each observation
+    """
+    df = pd.concat([pd.read_csv(f, dtype={col: str for col in CODE_WIDTHS})
+                    for f in files], ignore_index=True)
+    df = pad_codes(df)
+    return drop_duplicate_obs(df)
@@ -0,0 +1,139 @@
+__all__ = ['encode_keys','build_panel','panel_coverage']
+
+import numpy as np
+import pandas as pd
+
+from .utils import site_ids, sample_datetimes
+from .completeness import duration_table
+
+
+def encode_keys(df, sites, step, duration_steps = 1):
+    """
+    Description: integer (site, time step) key for each row
+    Samples that cover more than one step (e.g. 24 hour PM2.5 on an hourly panel)
+    are repeated on every step they cover
+
+    Libraries used
+    ----------
+    numpy (as np)
+
+    Parameters
+    ----------
+    df: dataframe with siteid, dtvar and sample_measurement columns
+    sites: array, sorted site vocabulary shared by all parameters
+    step: pd.Timedelta, panel time step
+    duration_steps: array or int, number of steps covered by each row
+
+    Returns
+    ----------
+    site_idx, t: int64 arrays of site number and time step for each (repeated) row
+    values: float array of measurements for each (repeated) row
+    """
+    site_idx = np.searchsorted(sites, df['siteid'].values).astype(np.int64)
+    t = df['dtvar'].values.astype('datetime64[ns]').astype(np.int64)//step.value
+    values = df['sample_measurement'].values.astype(float)
+    reps = np.maximum(np.broadcast_to(duration_steps, len(df)).astype(np.int64), 1)
+    if reps.max(initial=1) > 1:
+        offsets = np.arange(reps.sum()) - np.repeat(np.cumsum(reps) - reps, reps)
+        site_idx, values = np.repeat(site_idx, reps), np.repeat(values, reps)
+        t = np.repeat(t, reps) + offsets
+    return site_idx, t, values
+
+
+def build_panel(frames, step = '1h', how = 'outer'):
+    """
+    Description: aligns several parameter pulls on (site, time step)
+    Sites and times are integer encoded and joined with a sorted-key index join,
+    values finer than step are averaged into the step
+
+    Libraries used
+    ----------
+    numpy (as np)
+    pandas (as pd)
+
+    Functions used
+    ----------
+    site_ids()
+    sample_datetimes()
+    duration_table()
+    encode_keys()
+    panel_coverage()
+
+    Parameters
+    ----------
+    frames: dict, param name -> dataframe (get_url or aqs_df_out output)
+    step: str or pd.Timedelta, common time step. Default '1h'
+    how: str, 'outer' keeps every (site, time) seen, 'inner' only those with all parameters
+
+    Returns
+    ----------
+    df: wide panel with siteid, dtvar and one float column per parameter
+    df: co-location coverage for each site (see panel_coverage)
+    """
+    step = pd.Timedelta(step)
+    frames = {name: df for name, df in frames.items() if len(df) > 0}
+    for name, df in frames.items():
+        df = df.reset_index(drop=True)
+        if 'siteid' not in df.columns:
+            df['siteid'] = site_ids(df)
+        if 'dtvar' not in df.columns:
+            df['dtvar'] = sample_datetimes(df)
+        frames[name] = df
+    sites = np.unique(np.concatenate([df['siteid'].astype(str).values for df in frames.values()]))
+    durations = duration_table().set_index('Duration Code')['hours']
+    encoded = {}
+    for name, df in frames.items():
+        df = df.assign(siteid=df['siteid'].astype(str))
+        duration_steps = 1
+        if 'sample_duration_code' in df.columns:
+            hours = df['sample_duration_code'].astype(str).map(durations).astype(float).fillna(0).values
+            duration_steps = np.floor(hours*pd.Timedelta('1h').value/step.value).astype(np.int64)
+        encoded[name] = encode_keys(df, sites, step, duration_steps)
+    t0 = min(t.min() for s, t, v in encoded.values())
+    nsteps = max(t.max() for s, t, v in encoded.values()) - t0 + 1
+    columns = {}
+    for name, (site_idx, t, values) in encoded.items():
+        ok = ~np.isnan(values)
+        keys, inverse = np.unique(site_idx[ok]*nsteps + (t[ok] - t0), return_inverse=True)
+        mean = np.bincount(inverse, weights=values[ok])/np.bincount(inverse)
+        columns[name] = (keys, mean)
+    if how == 'inner':
+        panel_keys = columns[list(columns)[0]][0]
+        for keys, mean in columns.values():
+            panel_keys = np.intersect1d(panel_keys, keys, assume_unique=True)
+    else:
+        panel_keys = np.unique(np.concatenate([keys for keys, mean in columns.values()]))
+    panel = pd.DataFrame({
+        'siteid': pd.Categorical.from_codes(panel_keys//nsteps, categories=sites),
+        'dtvar': pd.to_datetime((panel_keys % nsteps + t0)*step.value),
+    })
+    for name, (keys, mean) in columns.items():
+        pos = np.searchsorted(keys, panel_keys)
+        pos[pos == len(keys)] = 0
+        found = keys[pos] == panel_keys if len(keys) else np.zeros(len(panel_keys), dtype=bool)
+        values = np.full(len(panel_keys), np.nan)
+        values[found] = mean[pos[found]]
+        panel[name] = values
+    return panel, panel_coverage(panel, list(columns))
+
+
+def panel_coverage(panel, params):
+    """
+    Description: co-location coverage for each site in a panel
+
+    Parameters
+    ----------
+    panel: dataframe from build_panel
+    params: list, parameter columns in the panel
+
+    Returns
+    ----------
+    df: per site- number of steps, steps with each parameter, steps with all parameters
+    and the fraction of steps with all parameters
+    """
+    present = panel[params].notna()
+    coverage = present.groupby(panel['siteid'], observed=True).sum()
+    coverage.insert(0, 'n_steps', panel.groupby('siteid', observed=True).size())
+    coverage['all_params'] = present.all(axis=1).groupby(panel['siteid'], observed=True).sum()
+    coverage['colocated_fraction'] = coverage['all_params']/coverage['n_steps']
+    return coverage.reset_index()
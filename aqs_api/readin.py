@@ -10,7 +10,9 @@ import re
 
 from .aqs_login import account_setup
 from .utils import dates_to_1year, check_services, check_filters, check_params
-from .utils import valid_code, valid_aqsdate,drop_unused_params
+from .utils import valid_code, valid_aqsdate,drop_unused_params, site_ids
+from .schemas import parse_response, pad_codes
+from .summaries import SUMMARY_SERVICES, derive_summary
 from .user_info import info
 
 def get_login():
@@ -53,16 +55,19 @@ def get_aqs_lists(filterservice, **kwargs):
     Functions used
     ----------
     get_login()    
+    parse_response()
     
     Parameters
     ----------
     filterservice: str, the name of the filterservice to get a list of
     **kwargs: dict, necessary parameters for filterservices with required parameters for list
+        backend: str, optional- 'pandas' (default), 'arrow' or 'polars'
     
     Returns
     ----------
     df: a dataframe of possible codes/names
     """
+    backend = kwargs.pop('backend', 'pandas')
     HOST = "https://aqs.epa.gov/data/api"
     service = 'list'
     base_url = "/".join([HOST, service, filterservice])
@@ -72,8 +77,7 @@ def get_aqs_lists(filterservice, **kwargs):
     for key, value in kwargs.items():
         predicates[key] = value
     r = requests.get(base_url, params=predicates)
-    df = pd.read_json(r.url,typ='series')
-    data = pd.DataFrame(df['Data'])
+    data = parse_response(r.text, service, backend)
     return data
 
 def get_url(service, filterservice, **kwargs):
@@ -91,12 +95,14 @@ def get_url(service, filterservice, **kwargs):
     aqs_df_out()
     check_input()
     drop_unused_params()
+    parse_response()
     
     Parameters
     ----------
     service: str, the name of the service of the type of data to retrieve
     filterservice: str, the name of the filterservice to get a list of
     **kwargs: dict, necessary parameters for filterservices with required parameters for list
+        backend: str, optional- 'pandas' (default), 'arrow' or 'polars'
     
     Returns
     ----------
@@ -104,6 +110,7 @@ def get_url(service, filterservice, **kwargs):
     """
     if 'count' in kwargs.keys():
         count = kwargs.pop('count')
+    backend = kwargs.pop('backend', 'pandas')
         
     HOST = "https://aqs.epa.gov/data/api"
     base_url = "/".join([HOST, service, filterservice])
@@ -118,13 +125,12 @@ def get_url(service, filterservice, **kwargs):
         predicates[key] = value
     r = requests.get(base_url, params=predicates)
     print('*'*20,'Success!','*'*20)
-    df = pd.read_json(r.url,typ='series')
-    data=pd.DataFrame(df['Data'])
+    data = parse_response(r.text, service, backend)
     print('Link to site with json for final file is:\n {0}'.format(r.url))
     # data = aqs_df_out(pd.DataFrame(df['Data']))
     return data, kwargs
 
-def aqs_df_out(df):
+def aqs_df_out(df, backend = 'pandas'):
     """
     Description: Filters obtained AQS data for missing/bad data
     Keeps relevant columns for sample measurement
@@ -135,32 +141,41 @@ def aqs_df_out(df):
     ----------
     pandas (as pd)
     
+    Functions used
+    ----------
+    pad_codes()
+    site_ids()
+    aqs_df_out_arrow() (arrow/polars backends)
     
     Parameters
     ----------
     df: dataframe- complete dataframe of data pulled from AQS API
+    backend: str, 'pandas' (default), 'arrow' or 'polars'- arrow/polars use Arrow compute
     
     Returns
     ----------
     df: a simplified/filtered datafram with AQS info
     """
+    if backend != 'pandas':
+        from .backends import aqs_df_out_arrow
+        return aqs_df_out_arrow(df, backend)
     cols_out = ['dtvar','siteid','parameter_code','sample_measurement',
                 # 'units_of_measure_code',
                 'method_code','sample_duration_code']
     df[['date_local','time_local']].apply(lambda s: ' '.join(s.values.astype(str)), axis="columns")
     df['dtvar'] = pd.to_datetime(df[['date_local','time_local']]
                                   .apply(lambda s: ' '.join(s.values.astype(str))
-                                         , axis="columns"), format='%Y-%m-%d %H:%S')
+                                         , axis="columns"), format='%Y-%m-%d %H:%M')
     # df['siteid'] = (df[['state_code','county_code','site_number','poc']]
     #                               .apply(lambda s: ''.join(s.values.astype(str))
     #                                      , axis="columns")) 
-    df['siteid'] = (df[['state_code','county_code','site_number','poc']]
-                                  .apply(lambda s: '{0:02d}{1:03d}{2:04d}'.format(
-                                      s['state_code'],s['county_code'],s['site_number'])
-                                         , axis="columns")) 
-    ppm2ppb = (df.loc[(df.units_of_measure_code == '007')|(df.units_of_measure_code == 7)].index)
+    df = pad_codes(df)
+    df['siteid'] = site_ids(df)
+    ppm2ppb = (df.loc[df.units_of_measure_code.isin(['007'])].index)
     df.loc[ppm2ppb,'sample_measurement'] = df.loc[ppm2ppb,'sample_measurement']*1000 
-    val_filter = ((df.qualifier[0]=='V')|(df.qualifier.isna()))
+    # same rule as backends.aqs_filter_expression: no qualifier, or a V- (validated) one
+    qualifier = df['qualifier'].astype('string')
+    val_filter = (qualifier.isna() | qualifier.str.startswith('V').fillna(False)).astype(bool)
     meas_filter = (df.sample_measurement.notna())
     df_out = df.loc[meas_filter&val_filter][cols_out]
     df_out = df_out.sort_values(by='dtvar',ignore_index=True)
@@ -180,41 +195,54 @@ def get_aqs_data(service, filterservice, **kwargs):
     Functions used
     ----------
     get_pc_params()    
+    CodeCatalog.param_name(), CodeCatalog.state_name()
     dates_to_1year()
     get_url()
+    derive_summary()
+    write_csv()
     
     Parameters
     ----------
     service: str, the name of the service of the type of data to retrieve
     filterservice: str, the name of the filterservice to get a list of
     **kwargs: dict, necessary parameters for filterservices with required parameters for list
+        derive: bool, optional- for dailyData/quarterlyData/annualData, pull sampleData 
+        and derive the summary locally instead of an extra request. Default False
+        backend: str, optional- 'pandas' (default), 'arrow' or 'polars' for every year
+        (derived summaries are always built with pandas)
     
     Returns
     ----------
     df: a dataframe with all defined years/parameters
     """
-    from aqs_api.user_info import info
+    from .backends import BACKENDS, write_csv
+    from .client import CodeCatalog
     directory = info['directory']
-    from aqs_api.aqs_codes import param, state
-    paramin = param
-    file_names = {'param':paramin,
-                 'state':state}
-
-    param = file_names.get('param', {}).get(kwargs['param'])
-    state = file_names.get('state', {}).get(kwargs['state'])
+    derive = kwargs.pop('derive', False)
+    backend = kwargs.pop('backend', 'pandas')
+    if backend not in BACKENDS:
+        print('Error: {0} not in available backends {1}'.format(backend, BACKENDS))
+        return None
     if ('pc' in kwargs.keys()):
         params = get_pc_params(kwargs['pc'])
         kwargs['param'] = params[0]
+    # file names use the parameter/state names from the code files
+    catalog = CodeCatalog()
+    param = catalog.param_name(kwargs['param']).replace(' ', '_')
+    state = catalog.state_name(kwargs.get('state', '')).replace(' ', '_')
     bdates, edates = dates_to_1year(kwargs['bdate'],kwargs['edate'])
     count = 0
     for start, end in zip(list(bdates), list(edates)):
         #print(start, end)
         kwargs['bdate'],kwargs['edate'] = start, end
-        df_temp, kwargs = get_url(service, filterservice, count=count, **kwargs)
+        if derive and (service in SUMMARY_SERVICES):
+            # summaries are derived with pandas
+            df_temp, kwargs = get_url('sampleData', filterservice, count=count, **kwargs)
+            df_temp = derive_summary(df_temp, service)
+        else:
+            df_temp, kwargs = get_url(service, filterservice, count=count, backend=backend, **kwargs)
         file_out = '{0}{1}_{2}_{3}.csv'.format(directory,start[:4],param,state)
-        df_temp.to_csv(file_out,
-                sep = ',', doublequote = False, index=False,
-                  )
+        write_csv(df_temp, file_out)
 
         count += 1
 
@@ -243,7 +271,7 @@ def get_pc_params(pc):
     if pc not in pc_list:
         print(':( '*10,'Failed: check parameter class input',':( '*10)
         return print(pc_list)
-    return list(get_aqs_lists('parametersByClass',pc =kwargs['pc'])['code'])
+    return list(get_aqs_lists('parametersByClass',pc =pc)['code'])
         
     
 def check_input(service, filterservice, **kwargs):
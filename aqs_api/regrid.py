@@ -0,0 +1,187 @@
+__all__ = ['site_table','grid_points','regrid_weights','regrid']
+
+import numpy as np
+import pandas as pd
+
+from .utils import site_ids, sample_datetimes
+
+EARTH_RADIUS_KM = 6371.0
+
+
+def site_table(df):
+    """
+    Description: site coordinates (one row per site) from fetched data or a site registry
+
+    Functions used
+    ----------
+    site_ids()
+
+    Parameters
+    ----------
+    df: dataframe with latitude/longitude and siteid (or state_code, county_code, site_number)
+
+    Returns
+    ----------
+    df: siteid, latitude, longitude sorted by siteid
+    """
+    siteid = df['siteid'].astype(str) if 'siteid' in df.columns else site_ids(df)
+    sites = (pd.DataFrame({'siteid': siteid.values,
+                           'latitude': df['latitude'].values.astype(float),
+                           'longitude': df['longitude'].values.astype(float)})
+               .groupby('siteid', as_index=False).mean())
+    return sites.dropna().reset_index(drop=True)
+
+
+def _unit_vectors(lat, lon):
+    """
+    Description: points on the unit sphere, so straight-line (chord) distances
+    can be used in a KD-tree and converted to great circle distances
+    """
+    lat, lon = np.radians(lat), np.radians(lon)
+    return np.column_stack([np.cos(lat)*np.cos(lon), np.cos(lat)*np.sin(lon), np.sin(lat)])
+
+
+def grid_points(grid_lat, grid_lon):
+    """
+    Description: flattened cell centers of a target grid
+
+    Parameters
+    ----------
+    grid_lat: array, 1D latitudes (regular grid) or 2D latitude of each cell (model grid)
+    grid_lon: array, 1D longitudes or 2D longitude of each cell
+
+    Returns
+    ----------
+    lat, lon: 1D arrays of cell centers
+    shape: tuple, grid shape (ny, nx)
+    """
+    grid_lat, grid_lon = np.asarray(grid_lat, dtype=float), np.asarray(grid_lon, dtype=float)
+    if grid_lat.ndim == 1:
+        grid_lon, grid_lat = np.meshgrid(grid_lon, grid_lat)
+    return grid_lat.ravel(), grid_lon.ravel(), grid_lat.shape
+
+
+def regrid_weights(sites, grid_lat, grid_lon, method = 'idw', k = 8, power = 2,
+                   max_distance_km = None):
+    """
+    Description: sparse station-to-grid weight matrix, computed once per site set and grid
+    and reused for every time step
+
+    Libraries used
+    ----------
+    numpy (as np)
+    scipy.sparse
+    scipy.spatial
+
+    Functions used
+    ----------
+    grid_points()
+
+    Parameters
+    ----------
+    sites: dataframe from site_table() (siteid, latitude, longitude)
+    grid_lat: array, 1D or 2D grid latitudes
+    grid_lon: array, 1D or 2D grid longitudes
+    method: str, 'idw' (inverse distance) or 'nearest'. Default 'idw'
+    k: int, number of nearest sites used by idw. Default 8
+    power: float, idw distance power. Default 2
+    max_distance_km: float, optional, ignore sites further away than this
+
+    Returns
+    ----------
+    dict: weights (scipy.sparse csr, cells x sites), siteid (site order of the columns),
+    shape (grid shape)
+    """
+    from scipy import sparse
+    from scipy.spatial import cKDTree
+    lat, lon, shape = grid_points(grid_lat, grid_lon)
+    sites = sites.sort_values(by='siteid', ignore_index=True)
+    nsites = len(sites)
+    if method == 'nearest':
+        k = 1
+    elif method != 'idw':
+        print('Error: {0} not an available method (idw, nearest)'.format(method))
+        return None
+    k = min(k, nsites)
+    bound = np.inf
+    if max_distance_km != None:
+        bound = 2*np.sin(min(max_distance_km/EARTH_RADIUS_KM, np.pi)/2)
+    tree = cKDTree(_unit_vectors(sites['latitude'].values, sites['longitude'].values))
+    chord, idx = tree.query(_unit_vectors(lat, lon), k=k, distance_upper_bound=bound)
+    chord, idx = chord.reshape(len(lat), k), idx.reshape(len(lat), k)
+    found = idx < nsites
+    rows = np.repeat(np.arange(len(lat)), k).reshape(len(lat), k)
+    if method == 'nearest':
+        weight = np.ones(chord.shape)
+    else:
+        dist = 2*EARTH_RADIUS_KM*np.arcsin(np.minimum(chord[found]/2, 1))
+        weight = np.zeros(chord.shape)
+        # a site on a cell center gets (almost) all the weight
+        weight[found] = 1/np.maximum(dist, 1e-3)**power
+    weights = sparse.csr_matrix((weight[found], (rows[found], idx[found])), shape=(len(lat), nsites))
+    return {'weights': weights, 'siteid': sites['siteid'].values, 'shape': shape}
+
+
+def regrid(df, weights, value = 'sample_measurement', block = 256):
+    """
+    Description: regrids station data onto the grid for every time step
+    Data are put in a (sites x times) array (repeated site/times, e.g. several POCs or
+    methods, are averaged) and applied with sparse matrix products over blocks of
+    time steps; weights are renormalized by the sites that have data at each time step
+    Time steps are UTC (date_gmt/time_gmt) when the data has them, so sites in different
+    time zones line up with model output. Otherwise local standard time (dtvar or
+    date_local/time_local) is used and a warning is printed
+
+    Libraries used
+    ----------
+    numpy (as np)
+    pandas (as pd)
+
+    Functions used
+    ----------
+    site_ids()
+    sample_datetimes()
+
+    Parameters
+    ----------
+    df: dataframe of data (get_url/aqs_df_out output)
+    weights: dict from regrid_weights()
+    value: str, column to regrid. Default sample_measurement
+    block: int, time steps per sparse product (bounds the temporary arrays). Default 256
+
+    Returns
+    ----------
+    times: DatetimeIndex of the time steps (tz UTC from date_gmt/time_gmt, naive local otherwise)
+    array: regridded values, shape (times, ny, nx). NaN where no site with data is in range
+    """
+    siteid = df['siteid'].astype(str).values if 'siteid' in df.columns else site_ids(df).values
+    gmt = ('date_gmt' in df.columns) and ('time_gmt' in df.columns)
+    if gmt:
+        dtvar = sample_datetimes(df, gmt=True)
+    else:
+        print('Warning: no date_gmt/time_gmt, regridding on local time (sites in other time zones are not aligned)')
+        dtvar = df['dtvar'] if 'dtvar' in df.columns else sample_datetimes(df)
+    sites = weights['siteid']
+    col = np.searchsorted(sites, siteid)
+    col[col == len(sites)] = 0
+    known = sites[col] == siteid
+    t, times = pd.factorize(pd.to_datetime(dtvar).values[known], sort=True)
+    data = df[value].values.astype(float)[known]
+    ok = ~np.isnan(data)
+    flat = col[known][ok]*len(times) + t[ok]
+    size = len(sites)*len(times)
+    count = np.bincount(flat, minlength=size).reshape(len(sites), len(times))
+    total = np.bincount(flat, weights=data[ok], minlength=size).reshape(len(sites), len(times))
+    has_data = count > 0
+    with np.errstate(invalid='ignore', divide='ignore'):
+        values = total/count
+    W = weights['weights']
+    out = np.empty((len(times), W.shape[0]))
+    for start in range(0, len(times), block):
+        stop = min(start + block, len(times))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            out[start:stop] = ((W @ np.where(has_data[:, start:stop], values[:, start:stop], 0))
+                               /(W @ has_data[:, start:stop].astype(float))).T
+    out = out.reshape((len(times),) + tuple(weights['shape']))
+    times = pd.DatetimeIndex(times)
+    return (times.tz_localize('UTC') if gmt else times), out
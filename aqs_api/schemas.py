@@ -0,0 +1,280 @@
+__all__ = ['SCHEMAS','CODE_WIDTHS','get_schema','typed_column','pad_codes','report_drift','build_frame','parse_response']
+
+import json
+import numpy as np
+import pandas as pd
+
+# Zero-padded width of AQS code columns (API sends these as ints or strings)
+CODE_WIDTHS = {'state_code':2, 'county_code':3, 'site_number':4, 'parameter_code':5,
+               'method_code':3, 'units_of_measure_code':3, 'cbsa_code':5}
+
+_SITE = {'state_code':'code', 'county_code':'code', 'site_number':'code',
+         'parameter_code':'code', 'poc':'Int64', 'latitude':'float64', 'longitude':'float64',
+         'datum':'category', 'parameter':'category'}
+_PLACE = {'local_site_name':'string', 'site_address':'string', 'state':'category',
+          'county':'category', 'city':'category', 'cbsa_code':'code', 'cbsa':'category',
+          'date_of_last_change':'string'}
+_SUMMARY = {'sample_duration':'category', 'sample_duration_code':'category',
+            'pollutant_standard':'category', 'units_of_measure':'category',
+            'event_type':'category', 'observation_count':'Int64', 'observation_percent':'float64',
+            'arithmetic_mean':'float64', 'method_code':'code', 'method':'category'}
+_QA = {'state_code':'code', 'county_code':'code', 'site_number':'code',
+       'parameter_code':'code', 'poc':'Int64', 'latitude':'float64', 'longitude':'float64',
+       'parameter':'category', 'method_code':'code', 'method':'category',
+       'units_of_measure':'category', 'assessment_date':'string', 'qualifier':'string',
+       'pqao_code':'string', 'pqao':'category', 'monitoring_agency_code':'string',
+       'monitoring_agency':'category', 'state':'category', 'county':'category',
+       'date_of_last_change':'string'}
+
+# column -> target dtype for each service
+# 'code' columns are zero-padded strings (see CODE_WIDTHS)
+SCHEMAS = {
+    'list': {'code':'string', 'value_represented':'string'},
+    'sampleData': dict(_SITE, **{
+        'date_local':'string', 'time_local':'string', 'date_gmt':'string', 'time_gmt':'string',
+        'sample_measurement':'float64', 'units_of_measure':'category',
+        'units_of_measure_code':'code', 'sample_duration':'category',
+        'sample_duration_code':'category', 'sample_frequency':'category',
+        'detection_limit':'float64', 'uncertainty':'float64', 'qualifier':'string',
+        'method_type':'category', 'method':'category', 'method_code':'code',
+        'state':'category', 'county':'category', 'date_of_last_change':'string',
+        'cbsa_code':'code'}),
+    'dailyData': dict(_SITE, **_SUMMARY, **_PLACE, **{
+        'date_local':'string', 'validity_indicator':'category',
+        'first_max_value':'float64', 'first_max_hour':'Int64', 'aqi':'Int64'}),
+    'quarterlyData': dict(_SITE, **_SUMMARY, **_PLACE, **{
+        'year':'Int64', 'quarter':'Int64', 'minimum_value':'float64', 'maximum_value':'float64',
+        'quarterly_metric':'float64', 'quarterly_metric_description':'category',
+        'valid_samples':'Int64', 'valid_day_count':'Int64', 'scheduled_samples':'Int64'}),
+    'annualData': dict(_SITE, **_SUMMARY, **_PLACE, **{
+        'year':'Int64', 'completeness_indicator':'category', 'valid_day_count':'Int64',
+        'required_day_count':'Int64', 'exceptional_data_count':'Int64',
+        'null_observation_count':'Int64', 'primary_exceedance_count':'Int64',
+        'secondary_exceedance_count':'Int64', 'certification_indicator':'category',
+        'num_obs_below_mdl':'Int64', 'standard_deviation':'float64',
+        'first_max_value':'float64', 'first_max_datetime':'string',
+        'second_max_value':'float64', 'second_max_datetime':'string',
+        'ninety_ninth_percentile':'float64', 'ninety_eighth_percentile':'float64',
+        'ninety_fifth_percentile':'float64', 'ninetieth_percentile':'float64',
+        'seventy_fifth_percentile':'float64', 'fiftieth_percentile':'float64',
+        'tenth_percentile':'float64'}),
+    'monitors': dict(_SITE, **{
+        'parameter_name':'category', 'open_date':'string', 'close_date':'string',
+        'concurred_exclusions':'string', 'dominant_source':'category',
+        'measurement_scale':'category', 'measurement_scale_def':'category',
+        'monitoring_objective':'category', 'last_method_code':'code',
+        'last_method_description':'category', 'last_method_begin_date':'string',
+        'naaqs_primary_monitor':'category', 'qa_primary_monitor':'category',
+        'monitor_type':'category', 'networks':'category', 'monitoring_agency_code':'string',
+        'monitoring_agency':'category', 'si_id':'Int64', 'lat_lon_accuracy':'float64',
+        'elevation':'float64', 'probe_height':'float64', 'pl_probe_location':'category',
+        'local_site_name':'string', 'address':'string', 'state_name':'category',
+        'county_name':'category', 'city_name':'category', 'cbsa_code':'code',
+        'cbsa_name':'category', 'csa_code':'string', 'csa_name':'category',
+        'tribal_code':'string', 'tribe_name':'category'}),
+    'qaAnnualPerformanceEvaluations': dict(_QA, **{
+        'level':'Int64', 'assessed_concentration':'float64', 'monitor_concentration':'float64',
+        'percent_difference':'float64'}),
+    'qaBlanks': dict(_QA, **{
+        'blank_type':'category', 'value':'float64'}),
+    'qaCollocatedAssessments': dict(_QA, **{
+        'primary_poc':'Int64', 'primary_sample_value':'float64',
+        'collocated_poc':'Int64', 'collocated_sample_value':'float64'}),
+    'qaFlowRateVerifications': dict(_QA, **{
+        'sample_duration':'category', 'monitor_flow_rate':'float64',
+        'assessment_flow_rate':'float64', 'percent_difference':'float64'}),
+    'qaFlowRateAudits': dict(_QA, **{
+        'sample_duration':'category', 'monitor_flow_rate':'float64',
+        'assessment_flow_rate':'float64', 'percent_difference':'float64'}),
+    'qaOnePointQcRawData': dict(_QA, **{
+        'assessed_concentration':'float64', 'monitor_concentration':'float64',
+        'percent_difference':'float64'}),
+    'qaPepAudits': dict(_QA, **{
+        'sample_duration':'category', 'pep_sample_value':'float64',
+        'primary_sample_value':'float64', 'percent_difference':'float64'}),
+    'transactionsSample': {
+        'transaction_type':'category', 'action_indicator':'category',
+        'state_code':'code', 'county_code':'code', 'site_number':'code',
+        'parameter':'code', 'poc':'Int64', 'sample_duration_code':'category',
+        'units_of_measure_code':'code', 'method':'code', 'date':'string', 'time':'string',
+        'sample_value':'float64', 'null_data_code':'category',
+        'collection_frequency_code':'category', 'monitor_protocol_id':'string',
+        'qualifier_1':'category', 'qualifier_2':'category', 'qualifier_3':'category',
+        'alternate_method_detection_limit':'float64', 'uncertainty':'float64'},
+    'transactionsQaAnnualPerformanceEvaluations': {
+        'transaction_type':'category', 'action_indicator':'category',
+        'assessment_type':'category', 'state_code':'code', 'county_code':'code',
+        'site_number':'code', 'parameter_code':'code', 'poc':'Int64',
+        'assessment_date':'string', 'assessment_number':'Int64',
+        'monitor_method_code':'code', 'reported_unit':'code', 'level':'Int64',
+        'monitor_concentration':'float64', 'assessment_concentration':'float64'},
+}
+
+
+def get_schema(service):
+    """
+    Description: column -> dtype schema for a service
+
+    Parameters
+    ----------
+    service: str, the name of the service of the type of data to retrieve
+
+    Returns
+    ----------
+    dict: schema (empty if the service has no schema, all columns are inferred)
+    """
+    return SCHEMAS.get(service, {})
+
+
+def typed_column(name, values, dtype):
+    """
+    Description: builds one typed column straight from the parsed values
+
+    Libraries used
+    ----------
+    numpy (as np)
+    pandas (as pd)
+
+    Parameters
+    ----------
+    name: str, column name (used for code widths)
+    values: object array (or list) of parsed json values (None/NaN for null)
+    dtype: str, target dtype from the schema
+
+    Returns
+    ----------
+    array: numpy/pandas array of the target dtype
+    """
+    if dtype == 'float64':
+        return np.array(values, dtype=np.float64)
+    elif dtype == 'code':
+        # pad the distinct codes only (-1 from factorize picks the trailing missing value)
+        codes, uniques = pd.factorize(values)
+        padded = [str(code).zfill(CODE_WIDTHS.get(name, 0)) for code in uniques]
+        return pd.array(padded + [None], dtype='string')[codes]
+    elif dtype == 'category':
+        codes, uniques = pd.factorize(values, sort=True)
+        return pd.Categorical.from_codes(codes, categories=uniques)
+    return pd.array(values, dtype=dtype)
+
+
+def pad_codes(df):
+    """
+    Description: zero-pads the code columns of a dataframe (see CODE_WIDTHS)
+    csv files and the local store give codes back as ints (7 instead of '007')
+
+    Parameters
+    ----------
+    df: dataframe of data pulled from AQS API
+
+    Returns
+    ----------
+    df: same dataframe, code columns as zero-padded strings (changed in place)
+    """
+    for col, width in CODE_WIDTHS.items():
+        if col in df.columns:
+            codes = df[col]
+            if pd.api.types.is_numeric_dtype(codes):
+                codes = codes.astype('Int64')
+            df[col] = codes.astype('string').str.zfill(width)
+    return df
+
+
+def report_drift(service, names):
+    """
+    Description: prints a warning for columns the API added or dropped compared to the schema
+
+    Parameters
+    ----------
+    service: str, the name of the service of the type of data to retrieve
+    names: list, column names from the API
+
+    Returns
+    ----------
+    (None)
+    """
+    schema = get_schema(service)
+    if len(schema) > 0:
+        extra = [name for name in names if name not in schema]
+        missing = [name for name in schema if name not in names]
+        if len(extra) > 0:
+            print('Warning: schema drift for {0}: new columns from API {1}'.format(service, extra))
+        if len(missing) > 0:
+            print('Warning: schema drift for {0}: columns missing from API {1}'.format(service, missing))
+
+
+def build_frame(rows, service, backend = 'pandas'):
+    """
+    Description: builds a typed dataframe from the parsed rows for a service
+    The row dicts are lined up by key in one pass (pandas C code, so rows with a
+    different key order or missing keys still line up), then each column is converted
+    once to its schema dtype (no dtype inference for known columns). Prints a warning
+    for any drift between the API and the schema
+
+    Functions used
+    ----------
+    get_schema()
+    typed_column()
+    report_drift()
+    arrow_frame()
+
+    Parameters
+    ----------
+    rows: list of dicts, the 'Data' section of the response
+    service: str, the name of the service of the type of data to retrieve
+    backend: str, 'pandas' (default), 'arrow' (pyarrow Table) or 'polars' (polars DataFrame)
+
+    Returns
+    ----------
+    df: typed dataframe (or table) for the backend
+    """
+    schema = get_schema(service)
+    if len(rows) == 0:
+        names = list(schema.keys())
+        columns = [np.array([], dtype=object) for name in names]
+    else:
+        raw = pd.DataFrame(rows, dtype=object)
+        names = list(raw.columns)
+        columns = [raw[name].values for name in names]
+        del raw
+        report_drift(service, names)
+    if backend != 'pandas':
+        from .backends import arrow_frame
+        return arrow_frame(names, columns, service, backend)
+    data = {}
+    for name, values in zip(names, columns):
+        dtype = schema.get(name)
+        if dtype == None:
+            data[name] = pd.array(values)
+            continue
+        try:
+            data[name] = typed_column(name, values, dtype)
+        except (ValueError, TypeError):
+            print('Warning: schema drift for {0}.{1}: values are not {2}'.format(service, name, dtype))
+            data[name] = pd.array(values)
+    return pd.DataFrame(data, columns=names, copy=False)
+
+
+def parse_response(text, service, backend = 'pandas'):
+    """
+    Description: parses the json text from the AQS API into a typed dataframe
+
+    Libraries used
+    ----------
+    json
+
+    Functions used
+    ----------
+    build_frame()
+
+    Parameters
+    ----------
+    text: str, response text from the AQS API
+    service: str, the name of the service of the type of data to retrieve
+    backend: str, 'pandas' (default), 'arrow' or 'polars'
+
+    Returns
+    ----------
+    df: typed dataframe (or table) of the 'Data' section
+    """
+    return build_frame(json.loads(text)['Data'], service, backend=backend)
@@ -0,0 +1,194 @@
+__all__ = ['SUMMARY_SERVICES','grouped_stats','derive_daily','derive_quarterly','derive_annual','derive_summary']
+
+import numpy as np
+import pandas as pd
+
+from .utils import sample_datetimes, is_lpyr
+from .completeness import duration_table
+
+SUMMARY_SERVICES = ['dailyData','quarterlyData','annualData']
+
+SITE_COLS = ['state_code','county_code','site_number','parameter_code','poc',
+             'method_code','sample_duration_code']
+
+
+def grouped_stats(groups, values):
+    """
+    Description: grouped mean/max/count with numpy reductions (no python loop over groups)
+
+    Libraries used
+    ----------
+    numpy (as np)
+
+    Parameters
+    ----------
+    groups: array of int, group number (0..n-1) for each value
+    values: array of float, values (NaN are not counted)
+
+    Returns
+    ----------
+    dict: arrays 'count', 'mean', 'max' and 'argmax' (row of the max value) per group
+    """
+    groups = np.asarray(groups)
+    values = np.asarray(values, dtype=float)
+    ngroups = groups.max() + 1 if len(groups) else 0
+    ok = ~np.isnan(values)
+    count = np.bincount(groups[ok], minlength=ngroups)
+    total = np.bincount(groups[ok], weights=values[ok], minlength=ngroups)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = total/count
+    # sort by group then value: last row of each group is the (first) max
+    rows = np.flatnonzero(ok)
+    order = rows[np.lexsort((-rows, values[ok], groups[ok]))]
+    last = np.ones(len(order), dtype=bool)
+    last[:-1] = groups[order][1:] != groups[order][:-1]
+    argmax = np.full(ngroups, -1)
+    argmax[groups[order][last]] = order[last]
+    vmax = np.full(ngroups, np.nan)
+    vmax[groups[order][last]] = values[order][last]
+    return {'count': count, 'mean': mean, 'max': vmax, 'argmax': argmax}
+
+
+def _expected_per_day(df):
+    """
+    Description: expected samples per day from sample_duration_code (hours from durations.csv)
+    """
+    durations = duration_table().set_index('Duration Code')['hours']
+    hours = df['sample_duration_code'].astype(str).map(durations).astype(float)
+    return (24/hours).clip(lower=1).values
+
+
+def _summarize(df, period_cols, days):
+    """
+    Description: shared summary code for daily/quarterly/annual derivation
+
+    Parameters
+    ----------
+    df: dataframe of sampleData with a dtvar column
+    period_cols: dict, column name -> series with the period of each row
+    days: function, takes the summary frame and returns days in each period
+
+    Returns
+    ----------
+    df: one row per site/parameter/poc/method/duration/period
+    """
+    keys = df[[c for c in SITE_COLS if c in df.columns]].astype(str)
+    for col, val in period_cols.items():
+        keys[col] = val.values
+    groups, uniques = pd.MultiIndex.from_frame(keys).factorize()
+    stats = grouped_stats(groups, df['sample_measurement'].values)
+    out = uniques.to_frame(index=False, name=list(keys.columns))
+    expected = np.zeros(len(out))
+    np.maximum.at(expected, groups, _expected_per_day(df))
+    expected = expected*days(out)
+    out['observation_count'] = stats['count']
+    out['observation_percent'] = np.minimum(100, np.round(100*stats['count']/expected))
+    out['arithmetic_mean'] = stats['mean']
+    out['first_max_value'] = stats['max']
+    found = stats['argmax'] >= 0
+    max_dt = pd.Series(pd.NaT, index=out.index, dtype='datetime64[ns]')
+    max_dt[found] = df['dtvar'].values[stats['argmax'][found]]
+    out['first_max_datetime'] = max_dt
+    return out
+
+
+def derive_daily(df):
+    """
+    Description: dailyData-shaped summary from sampleData
+    mean, max, max hour, observation count and percent completeness per site-day
+
+    Functions used
+    ----------
+    sample_datetimes()
+    grouped_stats()
+
+    Parameters
+    ----------
+    df: dataframe of sampleData pulled from AQS API
+
+    Returns
+    ----------
+    df: one row per site/parameter/poc/method/duration/date_local
+    """
+    df = df.reset_index(drop=True)
+    df['dtvar'] = sample_datetimes(df)
+    out = _summarize(df, {'date_local': df['dtvar'].dt.strftime('%Y-%m-%d')},
+                     lambda out: 1)
+    out['first_max_hour'] = out.pop('first_max_datetime').dt.hour
+    return out
+
+
+def derive_quarterly(df):
+    """
+    Description: quarterlyData-shaped summary from sampleData
+    mean, max, observation count and percent completeness per site-quarter
+
+    Functions used
+    ----------
+    sample_datetimes()
+    grouped_stats()
+
+    Parameters
+    ----------
+    df: dataframe of sampleData pulled from AQS API
+
+    Returns
+    ----------
+    df: one row per site/parameter/poc/method/duration/year/quarter
+    """
+    df = df.reset_index(drop=True)
+    df['dtvar'] = sample_datetimes(df)
+    def days(out):
+        start = pd.to_datetime(pd.DataFrame({'year': out['year'].astype(int),
+                                             'month': (out['quarter'].astype(int)-1)*3 + 1, 'day': 1}))
+        return ((start + pd.offsets.QuarterBegin(startingMonth=1)) - start).dt.days.values
+    out = _summarize(df, {'year': df['dtvar'].dt.year.astype(str),
+                          'quarter': df['dtvar'].dt.quarter.astype(str)}, days)
+    return out
+
+
+def derive_annual(df):
+    """
+    Description: annualData-shaped summary from sampleData
+    mean, max, observation count and percent completeness per site-year
+
+    Functions used
+    ----------
+    sample_datetimes()
+    grouped_stats()
+    is_lpyr()
+
+    Parameters
+    ----------
+    df: dataframe of sampleData pulled from AQS API
+
+    Returns
+    ----------
+    df: one row per site/parameter/poc/method/duration/year
+    """
+    df = df.reset_index(drop=True)
+    df['dtvar'] = sample_datetimes(df)
+    days = lambda out: np.array([365 + int(is_lpyr(yr)) for yr in out['year']])
+    return _summarize(df, {'year': df['dtvar'].dt.year.astype(str)}, days)
+
+
+def derive_summary(df, service):
+    """
+    Description: derives the summary for a summary service from sampleData
+
+    Parameters
+    ----------
+    df: dataframe of sampleData pulled from AQS API
+    service: str, one of SUMMARY_SERVICES
+
+    Returns
+    ----------
+    df: summary dataframe (None if service can't be derived)
+    """
+    derive = {'dailyData': derive_daily,
+              'quarterlyData': derive_quarterly,
+              'annualData': derive_annual}
+    if service not in derive:
+        print('Error: {0} cannot be derived from sampleData, options: {1}'.format(service, SUMMARY_SERVICES))
+        return None
+    return derive[service](df)
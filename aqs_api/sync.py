@@ -0,0 +1,151 @@
+__all__ = ['sync_key','read_sync_state','refresh_data']
+
+import os
+import json
+import datetime as dt
+
+from .utils import dates_to_1year, get_api_service_info
+from .local_store import store_dir, store_data, add_coverage, covered_spans, uncovered_spans, _geo_key
+
+GEO_PARAMS = ['state','county','site','cbsa','pqao','ma','minlat','maxlat','minlon','maxlon']
+
+
+def sync_key(service, filterservice, **kwargs):
+    """
+    Description: key for the sync state of a service/param/geography
+
+    Parameters
+    ----------
+    service: str, the name of the service of the type of data to retrieve
+    filterservice: str, the name of the filterservice
+    **kwargs: dict, parameters for data retrieval (param + geography)
+
+    Returns
+    ----------
+    str: e.g. 'sampleData|44201|byState|state=24'
+    """
+    geo = ['{0}={1}'.format(key, kwargs[key]) for key in GEO_PARAMS if key in kwargs.keys()]
+    return '|'.join([service, str(kwargs.get('param')), filterservice] + geo)
+
+
+def read_sync_state(directory = None):
+    """
+    Description: reads the last sync date for each service/param/geography
+
+    Parameters
+    ----------
+    directory: str, optional, base directory. Default is info['directory']
+
+    Returns
+    ----------
+    dict: sync_key -> last sync date (YYYYMMDD)
+    """
+    state_file = store_dir(directory=directory) + 'sync_state.json'
+    if not os.path.exists(state_file):
+        return {}
+    with open(state_file) as f:
+        return json.load(f)
+
+
+def _write_sync_state(sync_state, directory = None):
+    os.makedirs(store_dir(directory=directory), exist_ok=True)
+    with open(store_dir(directory=directory) + 'sync_state.json', 'w') as f:
+        json.dump(sync_state, f, indent=1, sort_keys=True)
+
+
+def _coverage_geo(filterservice, **kwargs):
+    """
+    Description: geography used for coverage records of a refresh
+    bySite/byCounty/byState use the siteid prefix (shared with query_local), other
+    filterservices get a key of their own ('byCBSA|cbsa=12580|') that only matches itself
+    """
+    if filterservice in ['bySite','byCounty','byState']:
+        return _geo_key(kwargs.get('state'), kwargs.get('county'), kwargs.get('site'))
+    geo = ['{0}={1}'.format(key, kwargs[key]) for key in GEO_PARAMS if key in kwargs.keys()]
+    return '|'.join([filterservice] + geo) + '|'
+
+
+def _refresh_spans(service, param, geo, bdate, edate, directory = None):
+    """
+    Description: splits bdate-edate into spans already in the store (covered) and spans never pulled
+
+    Returns
+    ----------
+    list: (bdate, edate, covered) sorted by bdate, dates as str (YYYYMMDD)
+    """
+    start = dt.datetime.strptime(bdate, '%Y%m%d')
+    end = dt.datetime.strptime(edate, '%Y%m%d')
+    spans = [(b, e, False) for b, e in uncovered_spans(service, param, geo, bdate, edate, directory)]
+    for cov_start, cov_end in covered_spans(service, param, geo, directory):
+        if cov_end < start or cov_start > end:
+            continue
+        spans.append((max(cov_start, start).strftime('%Y%m%d'), min(cov_end, end).strftime('%Y%m%d'), True))
+    return sorted(spans)
+
+
+def refresh_data(service, filterservice, directory = None, **kwargs):
+    """
+    Description: incremental refresh of the local store
+    Date spans that were never pulled (see uncovered_spans) get a full pull and are added
+    to the coverage. Spans already pulled only ask the API for records changed since
+    the last sync (cbdate/cedate) and upsert them into the store, so widening bdate-edate
+    on a later call still pulls the new years in full
+
+    Functions used
+    ----------
+    get_api_service_info()
+    dates_to_1year()
+    uncovered_spans()
+    covered_spans()
+    get_url()
+    store_data()
+    add_coverage()
+    sync_key()
+
+    Parameters
+    ----------
+    service: str, the name of the service of the type of data to retrieve
+    filterservice: str, the name of the filterservice
+    directory: str, optional, base directory. Default is info['directory']
+    **kwargs: dict, necessary parameters for filterservice (param, bdate, edate, geography)
+
+    Returns
+    ----------
+    int: number of new or revised rows stored
+    """
+    from .readin import get_url
+    if 'cbdate' not in get_api_service_info(service, filterservice)['optional']:
+        print('Error: {0} does not support change dates (cbdate/cedate)'.format(service))
+        return 0
+    key = sync_key(service, filterservice, **kwargs)
+    sync_state = read_sync_state(directory)
+    today = dt.datetime.today().strftime('%Y%m%d')
+    last_sync = sync_state.get(key)
+    geo = _coverage_geo(filterservice, **kwargs)
+    written, failed = 0, False
+    for span_start, span_end, covered in _refresh_spans(service, kwargs['param'], geo,
+                                                        kwargs['bdate'], kwargs['edate'], directory):
+        # covered spans without a sync date (e.g. stored by query_local) get a full pull
+        changed_only = covered and (last_sync != None)
+        if changed_only:
+            print('Refreshing {0} {1} - {2}: records changed {3} - {4}'.format(key, span_start, span_end, last_sync, today))
+        bdates, edates = dates_to_1year(span_start, span_end)
+        for start, end in zip(bdates, edates):
+            request = dict(kwargs, bdate=start, edate=end)
+            if changed_only:
+                request['cbdate'], request['cedate'] = last_sync, today
+            result = get_url(service, filterservice, count=0, **request)
+            if result == None:
+                print('Failed to pull {0} - {1}, will be retried on the next refresh'.format(start, end))
+                failed = failed or changed_only
+                continue
+            data, request = result
+            written += store_data(data, service, kwargs['param'], directory)
+            if not covered:
+                add_coverage(service, kwargs['param'], geo, start, end, directory)
+    # keep the old sync date if a change-date pull failed, so those changes are asked for again
+    if not failed:
+        sync_state[key] = today
+        _write_sync_state(sync_state, directory)
+    print('{0} new or revised rows stored'.format(written))
+    return written
@@ -1,9 +1,13 @@
-__all__ = ['dates_to1year','check_services','check_filters','check_params','drop_unused_params','get_api_service_info','is_lpyr','last_day_in_month','valid_day','valid_aqsdate','valid_code']
+__all__ = ['CODE_DIR','dates_to1year','check_services','check_filters','check_params','drop_unused_params','get_api_service_info','is_lpyr','last_day_in_month','valid_day','valid_aqsdate','valid_code','site_ids','sample_datetimes']
 
+import os
 import datetime as dt
 import requests
 import pandas as pd
 
+# AQS code tables shipped with the package (durations.csv, collection_frequencies.csv, ...)
+CODE_DIR = os.path.join(os.path.dirname(__file__), 'aqs_code_files')
+
 
 def dates_to_1year(bdate,edate):
     """
@@ -388,6 +392,65 @@ def valid_code(key_in, value_in,**kwargs):
         return (code_find.code.values[0])
     except:
         print('Incorrect input for: {0} ,available options:'.format(key_in))
-        return print(vals.to_dict('split')['data'])            
-            
-            
+        return print(vals.to_dict('split')['data'])
+
+
+def site_ids(df):
+    """
+    Description: builds the 9 digit AQS site code (state+county+site number) for each row
+    Works whether the codes came back from the API as ints or zero-padded strings
+    
+    Libraries used
+    ----------
+    pandas (as pd)
+    
+    Parameters
+    ----------
+    df: dataframe with state_code, county_code and site_number columns
+    
+    Returns
+    ----------
+    series: str site codes, e.g. '240050001'
+    """
+    return (df['state_code'].astype(str).str.zfill(2)
+            + df['county_code'].astype(str).str.zfill(3)
+            + df['site_number'].astype(str).str.zfill(4))
+
+
+def sample_datetimes(df, gmt = False):
+    """
+    Description: builds a single datetime for each row from the AQS date/time columns
+    sampleData: date_local + time_local (date_gmt + time_gmt with gmt=True)
+    dailyData: date_local
+    quarterlyData/annualData: first day of the year (and quarter if given)
+    
+    Libraries used
+    ----------
+    pandas (as pd)
+    
+    Parameters
+    ----------
+    df: dataframe of data pulled from AQS API
+    gmt: bool, use date_gmt/time_gmt (UTC) instead of local standard time. Default False
+    
+    Returns
+    ----------
+    series: datetime64 values (NaT if no date columns found)
+    """
+    if gmt:
+        if ('date_gmt' not in df.columns) or ('time_gmt' not in df.columns):
+            print('Error: gmt=True needs date_gmt and time_gmt (sampleData)')
+            return pd.Series(pd.NaT, index=df.index)
+        return pd.to_datetime(df['date_gmt'].astype(str) + ' ' + df['time_gmt'].astype(str),
+                              format='%Y-%m-%d %H:%M')
+    if ('date_local' in df.columns) and ('time_local' in df.columns):
+        return pd.to_datetime(df['date_local'].astype(str) + ' ' + df['time_local'].astype(str),
+                              format='%Y-%m-%d %H:%M')
+    elif 'date_local' in df.columns:
+        return pd.to_datetime(df['date_local'].astype(str), format='%Y-%m-%d')
+    elif 'year' in df.columns:
+        month = 1
+        if 'quarter' in df.columns:
+            month = (df['quarter'].astype(int) - 1)*3 + 1
+        return pd.to_datetime(pd.DataFrame({'year': df['year'].astype(int), 'month': month, 'day': 1}))
+    return pd.Series(pd.NaT, index=df.index)
@@ -0,0 +1,73 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pa = pytest.importorskip('pyarrow')
+
+from aqs_api.readin import aqs_df_out
+from aqs_api.schemas import parse_response
+from aqs_api.backends import aqs_df_out_arrow, to_arrow, write_csv
+
+FIXTURES = os.path.join(os.path.dirname(__file__), 'fixtures')
+
+
+def load_text():
+    with open(os.path.join(FIXTURES, 'synthetic_sampleData_44201.json')) as f:
+        return f.read()
+
+
+def with_qualifiers(df):
+    qualifier = df['qualifier'].astype(object)
+    qualifier[0], qualifier[1] = 'V - Validated', 'IF - Fire'
+    return qualifier
+
+
+def test_parse_response_arrow_matches_pandas():
+    text = load_text()
+    df = parse_response(text, 'sampleData')
+    table = parse_response(text, 'sampleData', backend='arrow')
+    assert isinstance(table, pa.Table)
+    assert table.column_names == list(df.columns)
+    back = table.to_pandas()
+    for col in ['state_code','site_number','units_of_measure_code','time_local','sample_duration_code']:
+        assert list(back[col].astype(str)) == list(df[col].astype(str))
+    assert np.allclose(back['sample_measurement'], df['sample_measurement'])
+
+
+def test_aqs_df_out_arrow_matches_pandas():
+    text = load_text()
+    df = parse_response(text, 'sampleData')
+    df['qualifier'] = with_qualifiers(df)
+    table = to_arrow(df.astype({'qualifier': 'string'}))
+    expected = aqs_df_out(df.copy())
+    out = aqs_df_out_arrow(table).to_pandas()
+    assert len(out) == len(expected) == 41
+    assert list(out['siteid']) == list(expected['siteid'])
+    assert np.allclose(out['sample_measurement'], expected['sample_measurement'])
+    assert (pd.to_datetime(out['dtvar']).values == expected['dtvar'].values).all()
+
+
+@pytest.mark.parametrize('backend', ['pandas','arrow','polars'])
+def test_write_csv_matches_pandas(tmp_path, backend):
+    if backend == 'polars':
+        pytest.importorskip('polars')
+    text = load_text()
+    write_csv(parse_response(text, 'sampleData'), str(tmp_path / 'pandas.csv'))
+    write_csv(parse_response(text, 'sampleData', backend=backend), str(tmp_path / 'out.csv'))
+    expected = pd.read_csv(tmp_path / 'pandas.csv', dtype=str)
+    out = pd.read_csv(tmp_path / 'out.csv', dtype=str)
+    assert list(out.columns) == list(expected.columns)
+    pd.testing.assert_frame_equal(out, expected)
+
+
+def test_aqs_df_out_polars_matches_pandas():
+    pl = pytest.importorskip('polars')
+    text = load_text()
+    frame = parse_response(text, 'sampleData', backend='polars')
+    assert isinstance(frame, pl.DataFrame)
+    out = aqs_df_out(frame, backend='polars')
+    expected = aqs_df_out(parse_response(text, 'sampleData'))
+    assert out.height == len(expected) == 42
+    assert np.allclose(out['sample_measurement'].to_numpy(), expected['sample_measurement'].values)
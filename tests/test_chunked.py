@@ -0,0 +1,25 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from aqs_api.chunked import aggregate_files
+
+
+def test_aggregate_files_quantiles_any_units(tmp_path):
+    rng = np.random.default_rng(0)
+    files = []
+    for i, scale in enumerate([0.001, 1, 1000]):
+        # ppm, ppb and ug/m3 sized values spread over several orders of magnitude
+        df = pd.DataFrame({'state_code': '37', 'county_code': '183', 'site_number': '000{0}'.format(i),
+                           'sample_measurement': scale*rng.lognormal(2, 1.5, 3000)})
+        df.to_csv(tmp_path / '{0}.csv'.format(i), index=False)
+        files.append(str(tmp_path / '{0}.csv'.format(i)))
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        out = aggregate_files(files, chunksize=500)
+    data = pd.concat([pd.read_csv(f, dtype={'site_number': str}) for f in files])
+    true = data.groupby('site_number')['sample_measurement'].quantile([0.5, 0.9]).unstack()
+    assert list(out['count']) == [3000]*3
+    assert np.allclose(out['q50'].values, true[0.5].values, rtol=0.02)
+    assert np.allclose(out['q90'].values, true[0.9].values, rtol=0.02)
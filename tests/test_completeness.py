@@ -0,0 +1,43 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from aqs_api.schemas import parse_response
+from aqs_api.completeness import completeness_report, sample_frequency_days
+
+FIXTURES = os.path.join(os.path.dirname(__file__), 'fixtures')
+
+
+def load_sample():
+    with open(os.path.join(FIXTURES, 'synthetic_sampleData_44201.json')) as f:
+        return parse_response(f.read(), 'sampleData')
+
+
+def test_report_clipped_to_requested_dates():
+    report, gaps = completeness_report(load_sample(), bdate='20170618', edate='20170619')
+    assert len(report) == 1
+    assert report['year'].iloc[0] == 2017
+    assert report['observed'].iloc[0] == 42
+    assert report['expected'].iloc[0] == 48
+    assert len(gaps) == 1
+    assert gaps['gap_start'].iloc[0] == pd.Timestamp('2017-06-19 03:00')
+    assert gaps['gap_end'].iloc[0] == pd.Timestamp('2017-06-19 08:00')
+    assert gaps['missing'].iloc[0] == 6
+
+
+def test_report_defaults_to_calendar_year():
+    report, gaps = completeness_report(load_sample())
+    assert report['expected'].iloc[0] == 365*24
+    assert gaps['missing'].sum() == 365*24 - 42
+
+
+def test_sample_frequency_days_from_code_table(capsys):
+    frequency = pd.Series(['HOURLY', 'EVERY 6TH DAY', 'EVERY 3RD DAY:24-1 HR - PAMS', 'RANDOM',
+                           None, 'EVERY 9TH DAY'])
+    days = sample_frequency_days(frequency)
+    assert list(days[:3]) == [1, 6, 3]
+    assert np.isnan(days[3]) and np.isnan(days[4])
+    # not in collection_frequencies.csv: parsed from the text and reported
+    assert days[5] == 9
+    assert 'EVERY 9TH DAY' in capsys.readouterr().out
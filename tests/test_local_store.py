@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+
+from aqs_api.local_store import store_data, query_local
+from aqs_api.merge import merge_files
+
+
+def sample(values, rev = '2018-01-01', hours = 24):
+    times = pd.date_range('2017-06-18', periods=hours, freq='h')
+    return pd.DataFrame({'state_code': '37', 'county_code': '183', 'site_number': '0014',
+                         'parameter_code': '44201', 'poc': 1, 'method_code': '087',
+                         'sample_duration_code': '1', 'units_of_measure_code': '007',
+                         'date_local': times.strftime('%Y-%m-%d'), 'time_local': times.strftime('%H:%M'),
+                         'sample_measurement': values, 'date_of_last_change': rev})
+
+
+def stored(directory):
+    return query_local('sampleData', '44201', '20170618', '20170618', state='37', fetch=False,
+                       directory=directory)
+
+
+def test_store_identical_repull_writes_nothing(tmp_path):
+    directory = str(tmp_path) + '/'
+    values = np.linspace(0.02, 0.05, 24)
+    assert store_data(sample(values), 'sampleData', directory=directory) == 24
+    assert store_data(sample(values), 'sampleData', directory=directory) == 0
+    assert len(stored(directory)) == 24
+
+
+def test_store_latest_revision_wins(tmp_path):
+    directory = str(tmp_path) + '/'
+    store_data(sample(np.full(24, 0.03)), 'sampleData', directory=directory)
+    revised = sample(np.full(24, 0.04), rev='2019-01-01')
+    assert store_data(revised, 'sampleData', directory=directory) == 24
+    older = sample(np.full(24, 0.05), rev='2017-12-01')
+    assert store_data(older, 'sampleData', directory=directory) == 0
+    df = stored(directory)
+    assert len(df) == 24
+    assert (df['sample_measurement'] == 0.04).all()
+
+
+def test_merge_files_matches_int_and_padded_codes(tmp_path):
+    padded = sample(np.full(24, 0.03))
+    # same observations with codes as ints (as read back from a csv without dtypes), revised later
+    ints = sample(np.full(24, 0.04), rev='2019-01-01')
+    for col in ['state_code','county_code','site_number','parameter_code','method_code','units_of_measure_code']:
+        ints[col] = ints[col].astype(int)
+    padded.to_csv(tmp_path / 'a.csv', index=False)
+    ints.to_csv(tmp_path / 'b.csv', index=False, float_format='%g')
+    df = merge_files([str(tmp_path / 'a.csv'), str(tmp_path / 'b.csv')])
+    assert len(df) == 24
+    assert (df['sample_measurement'] == 0.04).all()
+    assert (df['method_code'] == '087').all()
+    assert (df['site_number'] == '0014').all()
+
+
+def test_query_local_empty_store_keeps_columns(tmp_path):
+    df = query_local('sampleData', '44201', '20170101', '20171231', state='37', fetch=False,
+                     directory=str(tmp_path) + '/', columns=['sample_measurement'])
+    assert len(df) == 0
+    assert list(df.columns) == ['siteid','dtvar','sample_measurement']
@@ -0,0 +1,38 @@
+import os
+
+import pandas as pd
+
+import aqs_api.readin as readin
+from aqs_api.schemas import parse_response
+
+FIXTURES = os.path.join(os.path.dirname(__file__), 'fixtures')
+
+
+def load_sample():
+    with open(os.path.join(FIXTURES, 'synthetic_sampleData_44201.json')) as f:
+        return parse_response(f.read(), 'sampleData')
+
+
+def test_get_aqs_data_derive_writes_daily_summary(tmp_path, monkeypatch):
+    requests = []
+    def get_url(service, filterservice, count = 0, backend = 'pandas', **kwargs):
+        requests.append(service)
+        return load_sample(), kwargs
+    monkeypatch.setattr(readin, 'get_url', get_url)
+    monkeypatch.setitem(readin.info, 'directory', str(tmp_path) + '/')
+    readin.get_aqs_data('dailyData', 'bySite', derive=True, param='44201', state='37',
+                        county='183', site='0014', bdate='20170618', edate='20170619')
+    assert requests == ['sampleData']
+    daily = pd.read_csv(tmp_path / '2017_Ozone_North_Carolina.csv')
+    assert list(daily['observation_count']) == [24, 18]
+
+
+def test_aqs_df_out_keeps_unqualified_and_validated_rows():
+    df = load_sample()
+    assert len(readin.aqs_df_out(df.copy())) == 42
+    df.loc[0, 'qualifier'] = 'V - Validated'
+    df.loc[1, 'qualifier'] = 'IF - Fire'
+    out = readin.aqs_df_out(df)
+    assert len(out) == 41
+    # ppm -> ppb
+    assert out['sample_measurement'].max() > 1
@@ -0,0 +1,30 @@
+import numpy as np
+import pandas as pd
+
+from aqs_api.regrid import site_table, regrid_weights, regrid
+
+
+def hourly(state, county, site, lat, lon, utc_offset, values, poc = 1):
+    gmt = pd.date_range('2017-06-18 12:00', periods=len(values), freq='h')
+    local = gmt + pd.Timedelta(hours=utc_offset)
+    return pd.DataFrame({'state_code': state, 'county_code': county, 'site_number': site, 'poc': poc,
+                         'latitude': lat, 'longitude': lon,
+                         'date_local': local.strftime('%Y-%m-%d'), 'time_local': local.strftime('%H:%M'),
+                         'date_gmt': gmt.strftime('%Y-%m-%d'), 'time_gmt': gmt.strftime('%H:%M'),
+                         'sample_measurement': values})
+
+
+def test_regrid_aligns_time_zones_on_gmt_and_averages_pocs():
+    # Raleigh (EST, UTC-5) and Los Angeles (PST, UTC-8), same UTC hours (AQS local times are standard time)
+    df = pd.concat([hourly('37', '183', '0014', 35.86, -78.57, -5, [10.0, 20.0, 30.0]),
+                    hourly('37', '183', '0014', 35.86, -78.57, -5, [20.0, 30.0, 40.0], poc=2),
+                    hourly('06', '037', '1103', 34.07, -118.23, -8, [50.0, 60.0, 70.0])],
+                   ignore_index=True)
+    weights = regrid_weights(site_table(df), [34.07, 35.86], [-118.23, -78.57], method='nearest')
+    times, out = regrid(df, weights, block=2)
+    assert len(times) == 3
+    assert str(times.tz) == 'UTC'
+    assert times[0] == pd.Timestamp('2017-06-18 12:00', tz='UTC')
+    # nearest site in each corner cell, POCs 1 and 2 averaged
+    assert np.allclose(out[:, 1, 1], [15, 25, 35])
+    assert np.allclose(out[:, 0, 0], [50, 60, 70])
@@ -0,0 +1,28 @@
+import json
+import os
+
+from aqs_api.schemas import parse_response
+
+FIXTURES = os.path.join(os.path.dirname(__file__), 'fixtures')
+
+
+def test_parse_response_lines_up_rows_by_key():
+    with open(os.path.join(FIXTURES, 'synthetic_sampleData_44201.json')) as f:
+        body = json.load(f)
+    rows = body['Data']
+    rows[1] = dict(reversed(list(rows[1].items())))
+    del rows[2]['qualifier']
+    rows[3]['units_of_measure_code'] = 7
+    df = parse_response(json.dumps(body), 'sampleData')
+    assert len(df) == 42
+    assert df['time_local'].iloc[1] == rows[1]['time_local']
+    assert df['sample_measurement'].iloc[1] == rows[1]['sample_measurement']
+    assert df['qualifier'].isna().all()
+    assert (df['units_of_measure_code'] == '007').all()
+    assert str(df['sample_duration'].dtype) == 'category'
+
+
+def test_parse_response_empty_data_has_schema_columns():
+    df = parse_response('{"Header": [{"status": "No data matched your selection"}], "Data": []}', 'sampleData')
+    assert len(df) == 0
+    assert 'sample_measurement' in df.columns